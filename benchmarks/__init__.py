@@ -0,0 +1 @@
+# benchmarks: suite de rendimiento sin interfaz (python -m benchmarks.ejecutar)
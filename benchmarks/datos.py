@@ -0,0 +1,93 @@
+# benchmarks/datos.py
+#
+# Generador de datasets sintéticos con el esquema de static/Base_datos.csv
+# (Nombre, País, Edad, Género, Peso, Altura), escalados a cualquier número de filas.
+# Las variantes anchas añaden columnas numéricas 'Medida_1'...'Medida_k'.
+
+import csv
+import os
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from herramientas.carga import RUTA_CSV_ESTATICO
+
+# Directorio donde se guardan los CSV generados (se reutilizan entre ejecuciones)
+DIRECTORIO_BENCHMARKS = os.environ.get('DIRECTORIO_BENCHMARKS',
+                                       os.path.join(tempfile.gettempdir(), 'act_pan_benchmarks'))
+
+# Filas generadas y escritas por bloque, para no tener nunca el dataset entero en memoria
+FILAS_POR_BLOQUE = 500_000
+
+# Fracción de nulos en las columnas extra de las variantes anchas
+FRACCION_NULOS = 0.01
+
+
+def _modelo_base(ruta_csv=RUTA_CSV_ESTATICO):
+    # Valores y distribuciones observados en el CSV estático
+    with open(ruta_csv, encoding='utf-8', newline='') as f:
+        filas = list(csv.DictReader(f))
+    nombres = [fila['Nombre'].split(' ', 1) for fila in filas]
+    numeros = {c: np.array([float(fila[c]) for fila in filas]) for c in ('Edad', 'Peso', 'Altura')}
+    paises, conteos = np.unique([fila['País'] for fila in filas], return_counts=True)
+    return {
+        'nombres': sorted({n[0] for n in nombres}),
+        'apellidos': sorted({n[1] for n in nombres if len(n) > 1}),
+        'paises': paises,
+        'pesos_paises': conteos / conteos.sum(),
+        'generos': sorted({fila['Género'] for fila in filas}),
+        'edad': (int(numeros['Edad'].min()), int(numeros['Edad'].max())),
+        'peso': (numeros['Peso'].mean(), numeros['Peso'].std()),
+        'altura': (numeros['Altura'].mean(), numeros['Altura'].std()),
+    }
+
+
+def _bloque(modelo, n, columnas_extra, rng):
+    nombres = np.char.add(np.char.add(rng.choice(modelo['nombres'], n), ' '), rng.choice(modelo['apellidos'], n))
+    altura = rng.normal(*modelo['altura'], n)
+    # El peso depende de la altura, como en los datos reales, para que la correlación no sea nula
+    peso = modelo['peso'][0] + (altura - modelo['altura'][0]) * 60 + rng.normal(0, modelo['peso'][1] * 0.6, n)
+    columnas = {
+        'Nombre': nombres,
+        'País': rng.choice(modelo['paises'], n, p=modelo['pesos_paises']),
+        'Edad': rng.integers(modelo['edad'][0], modelo['edad'][1] + 1, n),
+        'Género': rng.choice(modelo['generos'], n),
+        'Peso': peso.round(1),
+        'Altura': altura.round(2),
+    }
+    for i in range(columnas_extra):
+        valores = peso * rng.uniform(-1, 1) + rng.normal(0, 10, n)
+        nulos = rng.random(n) < FRACCION_NULOS
+        columnas[f'Medida_{i + 1}'] = pa.array(valores.round(3), mask=nulos)
+    return pa.table(columnas)
+
+
+def nombre_dataset(filas, columnas_extra=0):
+    return f"base_{filas}" if not columnas_extra else f"base_{filas}_ancha{columnas_extra}"
+
+
+def generar_csv(filas, columnas_extra=0, semilla=0, directorio=DIRECTORIO_BENCHMARKS):
+    # Escribe (si no existe ya) el CSV sintético y devuelve su ruta. Misma semilla -> mismo archivo.
+    ruta = os.path.join(directorio, f"{nombre_dataset(filas, columnas_extra)}_s{semilla}.csv")
+    if os.path.exists(ruta):
+        return ruta
+
+    os.makedirs(directorio, exist_ok=True)
+    modelo = _modelo_base()
+    rng = np.random.default_rng(semilla)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    escritor = None
+    try:
+        for inicio in range(0, filas, FILAS_POR_BLOQUE):
+            tabla = _bloque(modelo, min(FILAS_POR_BLOQUE, filas - inicio), columnas_extra, rng)
+            if escritor is None:
+                escritor = pacsv.CSVWriter(temporal, tabla.schema,
+                                           write_options=pacsv.WriteOptions(quoting_style='none'))
+            escritor.write_table(tabla)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    os.replace(temporal, ruta)
+    return ruta
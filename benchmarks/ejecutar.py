@@ -0,0 +1,307 @@
+# benchmarks/ejecutar.py
+#
+# Ejecuta cada página (inicio.py y pages/*.py) sin interfaz con el AppTest de Streamlit, para cada
+# opción de la barra lateral y cada tipo de gráfico, sobre datasets sintéticos de distintos tamaños.
+# Cada escenario corre en un proceso nuevo para medir su pico de memoria (RSS) por separado.
+#
+#   python -m benchmarks.ejecutar --filas 10000 100000 --salida resultados.json
+#   python -m benchmarks.ejecutar --filas 10000 100000 --salida nuevos.json --base resultados.json
+#
+# Con --base se comparan los resultados con una ejecución anterior y el proceso termina con código 1
+# si algún escenario es más lento o usa más memoria que la tolerancia permitida.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+import warnings
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from benchmarks.datos import generar_csv, nombre_dataset
+from herramientas.carga import _ruta_parquet, columnas_dataset, huella_archivo, ingerir_csv, num_filas
+
+try:
+    import resource
+except ImportError:  # Windows: no se mide el pico de memoria
+    resource = None
+
+DIRECTORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Variantes por defecto: (filas, columnas numéricas extra)
+VARIANTES = [
+    (10_000, 0), (100_000, 0), (1_000_000, 0), (10_000_000, 0),
+    (10_000, 100), (100_000, 100), (1_000_000, 100),
+]
+
+# Reruns sin cambios tras llegar a cada vista (mide la latencia con las cachés ya calientes)
+RERUNS = 3
+
+# Tiempo máximo por ejecución de la página dentro de un escenario
+TIEMPO_LIMITE_S = 600
+
+# Margen admitido frente a la base antes de considerar que un escenario ha empeorado
+TOLERANCIA = 0.25
+
+# Diferencias absolutas por debajo de estos valores se consideran ruido
+MINIMO_SEGUNDOS = 0.05
+MINIMO_MB = 20
+
+ETIQUETA_OPCION = "Selecciona una opción:"
+ETIQUETA_GRAFICO = "Selecciona el tipo de gráfico:"
+
+METRICAS = ['tiempo_s', 'primera_ejecucion_s', 'rerun_s', 'rss_pico_mb']
+
+
+def paginas():
+    directorio = os.path.join(DIRECTORIO_RAIZ, 'pages')
+    return ['inicio.py'] + sorted(os.path.join('pages', p) for p in os.listdir(directorio) if p.endswith('.py'))
+
+
+def preparar_dataset(filas, columnas_extra, semilla=0):
+    # Genera el CSV y lo ingiere siempre de nuevo para medir la ingesta; devuelve (handle, métricas)
+    inicio = time.perf_counter()
+    ruta_csv = generar_csv(filas, columnas_extra, semilla)
+    generacion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    clave = huella_archivo(ruta_csv)
+    with open(ruta_csv, 'rb') as archivo:
+        ruta = ingerir_csv(archivo, ',', _ruta_parquet(clave))
+    ingesta = time.perf_counter() - inicio
+
+    dataset = {'nombre': os.path.basename(ruta_csv), 'clave': clave, 'ruta': ruta}
+    return dataset, {
+        'dataset': nombre_dataset(filas, columnas_extra),
+        'filas': num_filas(dataset),
+        'columnas': len(columnas_dataset(dataset)),
+        'csv_mb': round(os.path.getsize(ruta_csv) / 2 ** 20, 1),
+        'parquet_mb': round(os.path.getsize(ruta) / 2 ** 20, 1),
+        'generacion_s': round(generacion, 3),
+        'ingesta_s': round(ingesta, 3),
+    }
+
+
+def _app(pagina, dataset):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(DIRECTORIO_RAIZ, pagina), default_timeout=TIEMPO_LIMITE_S)
+    at.session_state['dataset'] = dataset
+    return at
+
+
+def _selectbox(at, etiqueta):
+    for caja in list(at.sidebar.selectbox) + list(at.main.selectbox):
+        if caja.label == etiqueta:
+            return caja
+    return None
+
+
+def escenarios(pagina, dataset):
+    # Lista de pasos [(etiqueta, valor), ...] para llegar a cada vista de la página
+    at = _app(pagina, dataset)
+    at.run()
+    resultado = [[]]
+    opciones = _selectbox(at, ETIQUETA_OPCION)
+    for opcion in (opciones.options if opciones is not None else []):
+        _selectbox(at, ETIQUETA_OPCION).select(opcion)
+        at.run()
+        resultado.append([(ETIQUETA_OPCION, opcion)])
+        graficos = _selectbox(at, ETIQUETA_GRAFICO)
+        for grafico in (graficos.options if graficos is not None else []):
+            resultado.append([(ETIQUETA_OPCION, opcion), (ETIQUETA_GRAFICO, grafico)])
+    return resultado
+
+
+def _rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return round(pico / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def _excepciones(at):
+    return [str(e.value) for e in at.exception]
+
+
+def _mensajes_error(at):
+    # Mensajes st.error de la página (columnas que faltan, etc.): son parte de la vista, no un fallo
+    return [str(e.value) for e in at.error]
+
+
+def ejecutar_escenario(pagina, dataset, pasos, reruns=RERUNS):
+    # Se ejecuta en el proceso hijo: aplica los pasos uno a uno y mide la vista final
+    rss_inicial = _rss_pico_mb()
+    at = _app(pagina, dataset)
+    inicio = time.perf_counter()
+    try:
+        at.run()
+        primera = time.perf_counter() - inicio
+        for etiqueta, valor in pasos:
+            caja = _selectbox(at, etiqueta)
+            if caja is None:
+                raise LookupError(f"No se encontró el selector '{etiqueta}'")
+            caja.select(valor)
+            antes = time.perf_counter()
+            at.run()
+            primera = time.perf_counter() - antes
+        total = time.perf_counter() - inicio
+
+        tiempos = []
+        for _ in range(reruns):
+            antes = time.perf_counter()
+            at.run()
+            tiempos.append(time.perf_counter() - antes)
+    except Exception:
+        return {'estado': 'fallo', 'error': traceback.format_exc(limit=3), 'rss_inicial_mb': rss_inicial,
+                'rss_pico_mb': _rss_pico_mb()}
+
+    excepciones = _excepciones(at)
+    return {
+        'estado': 'error' if excepciones else 'ok',
+        'error': excepciones[0] if excepciones else None,
+        'mensajes_error': _mensajes_error(at),
+        'tiempo_s': round(total, 4),
+        'primera_ejecucion_s': round(primera, 4),
+        'rerun_s': round(statistics.median(tiempos), 4) if tiempos else None,
+        'rerun_max_s': round(max(tiempos), 4) if tiempos else None,
+        'rss_inicial_mb': rss_inicial,
+        'rss_pico_mb': _rss_pico_mb(),
+    }
+
+
+def _en_subproceso(**entrada):
+    # Descubrimiento y medición corren en procesos aparte: el proceso principal no carga las páginas
+    proceso = subprocess.run([sys.executable, '-m', 'benchmarks.ejecutar', '--escenario'],
+                             input=json.dumps(entrada), cwd=DIRECTORIO_RAIZ, capture_output=True, text=True)
+    lineas = proceso.stdout.strip().splitlines()
+    if proceso.returncode != 0 or not lineas:
+        raise RuntimeError(proceso.stderr[-2000:])
+    return json.loads(lineas[-1])
+
+
+def _vista(pasos):
+    return ' / '.join(valor for _, valor in pasos) or '(inicial)'
+
+
+def entorno():
+    import numpy
+    import pyarrow
+    import streamlit
+
+    return {
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'procesadores': os.cpu_count(),
+        'streamlit': streamlit.__version__,
+        'pandas': pd.__version__,
+        'numpy': numpy.__version__,
+        'pyarrow': pyarrow.__version__,
+    }
+
+
+def ejecutar(variantes=VARIANTES, paginas_elegidas=None, reruns=RERUNS, semilla=0, progreso=print):
+    datasets = []
+    resultados = []
+    for filas, columnas_extra in variantes:
+        dataset, metricas = preparar_dataset(filas, columnas_extra, semilla)
+        datasets.append(metricas)
+        progreso(f"{metricas['dataset']}: ingesta {metricas['ingesta_s']} s")
+        for pagina in paginas_elegidas or paginas():
+            for pasos in _en_subproceso(accion='descubrir', pagina=pagina, dataset=dataset):
+                try:
+                    resultado = _en_subproceso(accion='medir', pagina=pagina, dataset=dataset, pasos=pasos,
+                                               reruns=reruns)
+                except RuntimeError as e:
+                    resultado = {'estado': 'fallo', 'error': str(e)}
+                resultados.append({'dataset': metricas['dataset'], 'pagina': pagina, 'vista': _vista(pasos),
+                                   **resultado})
+                progreso(f"  {pagina} [{_vista(pasos)}]: {resultado['estado']} "
+                         f"{resultado.get('tiempo_s')} s, rerun {resultado.get('rerun_s')} s, "
+                         f"{resultado.get('rss_pico_mb')} MB")
+    return {'entorno': entorno(), 'datasets': datasets, 'resultados': resultados}
+
+
+def comparar(actual, base, tolerancia=TOLERANCIA):
+    # Une los escenarios de ambas ejecuciones y marca los que empeoran más de la tolerancia
+    clave = ['dataset', 'pagina', 'vista']
+    a = pd.DataFrame(actual['resultados'])
+    b = pd.DataFrame(base['resultados'])
+    tabla = a.merge(b, on=clave, how='outer', suffixes=('', '_base'), indicator=True)
+
+    # Solo se comparan escenarios presentes en ambas ejecuciones
+    ambas = tabla['_merge'] == 'both'
+    empeora = (tabla['estado'] != 'ok') & (tabla['estado_base'] == 'ok')
+    for metrica in METRICAS:
+        if metrica not in tabla or f'{metrica}_base' not in tabla:
+            continue
+        minimo = MINIMO_MB if metrica.endswith('_mb') else MINIMO_SEGUNDOS
+        diferencia = tabla[metrica] - tabla[f'{metrica}_base']
+        tabla[f'{metrica}_ratio'] = tabla[metrica] / tabla[f'{metrica}_base']
+        empeora |= (tabla[f'{metrica}_ratio'] > 1 + tolerancia) & (diferencia > minimo)
+    tabla['regresion'] = ambas & empeora.fillna(False)
+    tabla['presencia'] = tabla.pop('_merge').map({'both': 'ambas', 'left_only': 'nuevo', 'right_only': 'eliminado'})
+    columnas = clave + ['estado', 'estado_base'] + [c for m in METRICAS for c in (m, f'{m}_base', f'{m}_ratio')
+                                                    if c in tabla] + ['presencia', 'regresion']
+    return tabla[columnas]
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description="Benchmarks de las páginas de la aplicación")
+    parser.add_argument('--filas', type=int, nargs='+', help="Filas de cada dataset (por defecto, VARIANTES)")
+    parser.add_argument('--columnas-extra', type=int, nargs='+', default=[0],
+                        help="Columnas numéricas añadidas en las variantes anchas (con --filas)")
+    parser.add_argument('--paginas', nargs='+', help="Páginas a medir (por defecto, todas)")
+    parser.add_argument('--reruns', type=int, default=RERUNS)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default='resultados_benchmark.json')
+    parser.add_argument('--base', help="Resultados anteriores con los que comparar")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--escenario', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    from streamlit import logger
+
+    args = _argumentos()
+    # Los avisos de Streamlit sin servidor ("missing ScriptRunContext"...) no aportan nada aquí
+    logger.set_log_level('ERROR')
+    warnings.filterwarnings('ignore')
+    if args.escenario:
+        entrada = json.loads(sys.stdin.read())
+        if entrada['accion'] == 'descubrir':
+            print(json.dumps(escenarios(entrada['pagina'], entrada['dataset'])))
+        else:
+            pasos = [tuple(p) for p in entrada['pasos']]
+            print(json.dumps(ejecutar_escenario(entrada['pagina'], entrada['dataset'], pasos, entrada['reruns'])))
+        return 0
+
+    variantes = [(f, c) for c in args.columnas_extra for f in args.filas] if args.filas else VARIANTES
+    resultados = ejecutar(variantes, args.paginas, args.reruns, args.semilla)
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        tabla = comparar(resultados, base, args.tolerancia)
+        with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_rows', None):
+            print(tabla[tabla['regresion']].to_string(index=False)
+                  if tabla['regresion'].any() else "Sin regresiones frente a la base.")
+        print(tabla['presencia'].value_counts().to_string())
+        return 1 if tabla['regresion'].any() else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
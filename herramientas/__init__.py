@@ -0,0 +1,2 @@
+# herramientas/__init__.py
+# Utilidades compartidas por inicio.py y las páginas de la carpeta pages/
@@ -0,0 +1,82 @@
+# herramientas/almacen.py
+#
+# Almacén de datasets compartido por todo el proceso. Cada dataset distinto (por huella de contenido) se
+# convierte una sola vez del Parquet a un archivo Arrow IPC (Feather v2) sin comprimir, que se abre con
+# memory-map: las columnas apuntan directamente a las páginas del archivo, que el sistema operativo
+# comparte entre sesiones (y entre procesos). La memoria crece con los datasets distintos, no con las
+# sesiones abiertas.
+
+import os
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Datasets abiertos a la vez; al pasar de aquí se cierra el usado hace más tiempo
+MAX_ABIERTOS = 32
+
+_lock_conversion = threading.Lock()
+_lock_abiertos = threading.Lock()
+
+# ruta del Parquet -> (archivo mapeado, tabla)
+_abiertos = OrderedDict()
+
+
+def ruta_arrow(ruta_parquet):
+    return os.path.splitext(ruta_parquet)[0] + '.arrow'
+
+
+def convertir_a_arrow(ruta_parquet, destino):
+    # Row group a row group, para no tener el dataset entero en memoria durante la conversión
+    archivo = pq.ParquetFile(ruta_parquet)
+    temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with pa.OSFile(temporal, 'wb') as salida:
+            with pa.ipc.new_file(salida, archivo.schema_arrow) as escritor:
+                for i in range(archivo.num_row_groups):
+                    escritor.write_table(archivo.read_row_group(i))
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return destino
+
+
+def _abrir(ruta_parquet):
+    with _lock_abiertos:
+        if ruta_parquet in _abiertos:
+            _abiertos.move_to_end(ruta_parquet)
+            return _abiertos[ruta_parquet][1]
+    destino = ruta_arrow(ruta_parquet)
+    with _lock_conversion:
+        if not os.path.exists(destino):
+            convertir_a_arrow(ruta_parquet, destino)
+    # Lectura sin copia: los buffers de la tabla son vistas de solo lectura sobre el archivo mapeado
+    archivo = pa.memory_map(destino, 'r')
+    tabla = pa.ipc.open_file(archivo).read_all()
+    with _lock_abiertos:
+        if ruta_parquet in _abiertos:
+            # Otra sesión lo abrió a la vez
+            cerrados = [(archivo, tabla)]
+            tabla = _abiertos[ruta_parquet][1]
+        else:
+            _abiertos[ruta_parquet] = (archivo, tabla)
+            cerrados = [_abiertos.popitem(last=False)[1] for _ in range(len(_abiertos) - MAX_ABIERTOS)]
+    for archivo_cerrado, _ in cerrados:
+        archivo_cerrado.close()
+    return tabla
+
+
+def cerrar(ruta_parquet):
+    # Suelta el archivo mapeado del dataset (antes de borrarlo). El sistema lo desmapea, y libera el espacio
+    # en disco, cuando ya no queda ninguna tabla que use sus buffers.
+    with _lock_abiertos:
+        abierto = _abiertos.pop(ruta_parquet, None)
+    if abierto is not None:
+        abierto[0].close()
+
+
+def tabla_compartida(dataset, columnas=None):
+    tabla = _abrir(dataset['ruta'])
+    return tabla.select(columnas) if columnas is not None else tabla
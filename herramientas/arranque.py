@@ -0,0 +1,78 @@
+# herramientas/arranque.py
+#
+# Informe del tiempo de importación de cada página y presupuesto de arranque en frío.
+# Uso: python -m herramientas.arranque  (termina con código 1 si alguna página se pasa del presupuesto)
+
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+DIRECTORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tiempo máximo de importación en frío de los módulos de cada página (configurable por entorno)
+PRESUPUESTO_MS = float(os.environ.get('PRESUPUESTO_IMPORTACION_MS', '1500'))
+
+# Módulos que solo deben cargarse cuando se pide el gráfico o el modelo que los usa
+MODULOS_PESADOS = ['matplotlib', 'seaborn', 'sklearn', 'scipy', 'PIL']
+
+
+def paginas():
+    return [os.path.join(DIRECTORIO_RAIZ, 'inicio.py')] + sorted(glob.glob(os.path.join(DIRECTORIO_RAIZ, 'pages', '*.py')))
+
+
+def importaciones_pagina(ruta):
+    # Sentencias import del nivel superior de la página (las de dentro de funciones o ramas no cuentan)
+    with open(ruta, encoding='utf-8') as f:
+        arbol = ast.parse(f.read())
+    return [ast.unparse(n) for n in arbol.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+
+
+def medir_importacion(sentencias):
+    # Ejecuta las importaciones en un intérprete nuevo con -X importtime.
+    # Devuelve (milisegundos totales, conjunto de módulos cargados).
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', '\n'.join(sentencias)],
+        cwd=DIRECTORIO_RAIZ, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    modulos = set()
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        _, acumulado, nombre = linea[len('import time:'):].split('|')
+        modulos.add(nombre.strip())
+        # Solo las entradas sin sangría son importaciones de primer nivel (su tiempo ya incluye el resto)
+        if not nombre.startswith('  ', 1):
+            total_us += int(acumulado)
+    return total_us / 1000, modulos
+
+
+def informe_importacion(rutas=None):
+    filas = []
+    for ruta in rutas or paginas():
+        ms, modulos = medir_importacion(importaciones_pagina(ruta))
+        pesados = sorted(m for m in MODULOS_PESADOS if m in modulos)
+        filas.append({
+            'Página': os.path.relpath(ruta, DIRECTORIO_RAIZ),
+            'Importación (ms)': round(ms, 1),
+            'Módulos pesados cargados': ', '.join(pesados),
+            'Dentro del presupuesto': ms <= PRESUPUESTO_MS and not pesados,
+        })
+    return pd.DataFrame(filas)
+
+
+def verificar_presupuesto(rutas=None):
+    # Lista de páginas que incumplen el presupuesto (vacía si todo está bien); pensada para usarse en tests
+    informe = informe_importacion(rutas)
+    return informe[~informe['Dentro del presupuesto']]['Página'].tolist()
+
+
+if __name__ == '__main__':
+    informe = informe_importacion()
+    print(informe.to_string(index=False))
+    print(f"\nPresupuesto: {PRESUPUESTO_MS:.0f} ms por página")
+    sys.exit(0 if informe['Dentro del presupuesto'].all() else 1)
@@ -0,0 +1,66 @@
+# herramientas/cache.py
+
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    # Caché de proceso con expulsión LRU limitada por tamaño total en bytes.
+    # Se comparte entre sesiones, por eso todas las operaciones van bajo un lock.
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self._datos = OrderedDict()
+        self._tamanos = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave not in self._datos:
+                return None
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+
+    def guardar(self, clave, valor, tamano):
+        with self._lock:
+            if clave in self._datos:
+                self._total -= self._tamanos.pop(clave)
+                del self._datos[clave]
+            # Un valor que por sí solo supera el límite no se guarda (ni expulsa a los demás)
+            if tamano > self.limite_bytes:
+                return
+            self._datos[clave] = valor
+            self._tamanos[clave] = tamano
+            self._total += tamano
+            # Expulsar los menos usados recientemente hasta volver al límite
+            while self._total > self.limite_bytes:
+                antigua, _ = self._datos.popitem(last=False)
+                self._total -= self._tamanos.pop(antigua)
+
+    def descartar(self, condicion):
+        # Quita las entradas cuya clave cumple `condicion(clave)`
+        with self._lock:
+            for clave in [c for c in self._datos if condicion(c)]:
+                del self._datos[clave]
+                self._total -= self._tamanos.pop(clave)
+
+    def obtener_o_calcular(self, clave, calcular, medir):
+        valor = self.obtener(clave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(clave, valor, medir(valor))
+        return valor
+
+    def __contains__(self, clave):
+        with self._lock:
+            return clave in self._datos
+
+    def __len__(self):
+        with self._lock:
+            return len(self._datos)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return self._total
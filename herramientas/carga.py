@@ -0,0 +1,331 @@
+# herramientas/carga.py
+
+import codecs
+import csv
+import functools
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import streamlit as st
+
+from herramientas.almacen import cerrar, tabla_compartida
+from herramientas.cache import CacheLRU
+from herramientas.cubos import construir_cubo, ruta_cubo
+from herramientas.diagnostico import instrumentado
+from herramientas.disco import podar, tocar
+from herramientas.esquema import aplicar_tipos, inferir_tipos
+from herramientas.memoria import optimizar_tabla
+
+# Ruta absoluta al CSV estático, independiente del directorio desde el que se lance Streamlit
+RUTA_CSV_ESTATICO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'static', 'Base_datos.csv')
+
+# Directorio donde se guardan los datasets ingeridos en formato Parquet (uno por huella de contenido)
+DIRECTORIO_DATOS = os.environ.get('DIRECTORIO_DATOS', os.path.join(tempfile.gettempdir(), 'act_pan_datos'))
+
+# Espacio máximo en disco de los datasets ingeridos (Parquet, copia Arrow y cubo de cada uno); al superarlo
+# se borran los usados hace más tiempo
+LIMITE_DATOS_MB = int(os.environ.get('LIMITE_DATOS_MB', '8192'))
+
+# Memoria máxima que pueden ocupar los DataFrames leídos en caché (compartida por todas las sesiones)
+LIMITE_CACHE_MB = int(os.environ.get('LIMITE_CACHE_MB', '1024'))
+
+# Se incluye en el nombre de los Parquet; al cambiar la forma de ingerir, los archivos antiguos se ignoran
+VERSION_FORMATO = 2
+
+# Tamaño de cada bloque leído del CSV durante la ingesta; cada bloque se escribe como un row group
+TAMANO_BLOQUE = 16 * 1024 * 1024
+
+# Detección del formato: bytes de cada muestra (principio, centro y final) y delimitadores candidatos
+TAMANO_MUESTRA = 64 * 1024
+DELIMITADORES = ',;\t|'
+
+_BOMS = [(codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')]
+
+# Sin BOM: UTF-8 si la muestra es válida y, si no, la codificación de Excel en Windows
+_CODIFICACIONES = ['utf-8', 'cp1252']
+
+# Archivos de un dataset en DIRECTORIO_DATOS: empiezan por su huella
+_ARCHIVO_DATASET = re.compile(r'^([0-9a-f]{32})\.')
+
+_cache_df = CacheLRU(LIMITE_CACHE_MB * 1024 * 1024)
+
+# (ruta, mtime, tamaño) -> huella, para no volver a leer el archivo estático en cada rerun
+_huellas_archivos = {}
+
+
+def huella_flujo(archivo, al_leer=None):
+    # Calcula la huella leyendo el archivo por bloques, sin cargarlo entero en memoria.
+    # `al_leer(bytes)` se llama tras cada bloque (progreso, cancelación).
+    h = hashlib.blake2b(digest_size=16)
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+        h.update(bloque)
+        if al_leer is not None:
+            al_leer(len(bloque))
+    archivo.seek(0)
+    return h.hexdigest()
+
+
+def huella_archivo(ruta):
+    info = os.stat(ruta)
+    firma = (ruta, info.st_mtime_ns, info.st_size)
+    if firma not in _huellas_archivos:
+        with open(ruta, 'rb') as f:
+            _huellas_archivos[firma] = huella_flujo(f)
+    return _huellas_archivos[firma]
+
+
+def _muestras(archivo):
+    # Muestras del principio, el centro y el final del archivo (las de en medio empiezan en un salto de línea)
+    archivo.seek(0, os.SEEK_END)
+    tamano = archivo.tell()
+    muestras = []
+    for inicio in sorted({0, max(tamano // 2 - TAMANO_MUESTRA // 2, 0), max(tamano - TAMANO_MUESTRA, 0)}):
+        archivo.seek(inicio)
+        muestra = archivo.read(TAMANO_MUESTRA)
+        if inicio > 0:
+            muestra = muestra[muestra.find(b'\n') + 1:]
+        muestras.append(muestra)
+    archivo.seek(0)
+    return muestras
+
+
+def detectar_codificacion(muestra):
+    for bom, codificacion in _BOMS:
+        if muestra.startswith(bom):
+            return codificacion
+    for codificacion in _CODIFICACIONES:
+        try:
+            # Decodificador incremental: la muestra puede cortar un carácter multibyte al final
+            codecs.getincrementaldecoder(codificacion)().decode(muestra, final=False)
+            return codificacion
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def detectar_formato(archivo):
+    # (delimitador, codificación) a partir de varias muestras del archivo. El delimitador es el que más
+    # muestras eligen; las muestras en las que el Sniffer no decide no votan.
+    muestras = _muestras(archivo)
+    codificacion = detectar_codificacion(muestras[0])
+    if codificacion.startswith('utf-16'):
+        # Las muestras del centro pueden no estar alineadas a 2 bytes
+        muestras = muestras[:1]
+    votos = Counter()
+    for muestra in muestras:
+        texto = muestra.decode(codificacion, errors='ignore')
+        # Sin la última línea, que puede estar cortada
+        texto = texto[:texto.rfind('\n') + 1] or texto
+        try:
+            votos[csv.Sniffer().sniff(texto, delimiters=DELIMITADORES).delimiter] += 1
+        except csv.Error:
+            continue
+    delimitador = votos.most_common(1)[0][0] if votos else ','
+    return delimitador, codificacion
+
+
+def _tipos_enteros_a_float(esquema):
+    return {c.name: pa.float64() for c in esquema if pa.types.is_integer(c.type)}
+
+
+def _tipos_todo_texto(esquema):
+    return {c.name: pa.string() for c in esquema}
+
+
+# Si un bloque posterior no encaja con los tipos inferidos en el primero, se reintenta relajando los tipos
+_RELAJACIONES = [None, _tipos_enteros_a_float, _tipos_todo_texto]
+
+
+def _sin_aviso(fase, lote=None):
+    pass
+
+
+@instrumentado('carga CSV')
+def ingerir_csv(archivo, delimitador, destino, codificacion='utf-8', avisar=_sin_aviso):
+    # Convierte el CSV a Parquet bloque a bloque: en memoria solo hay unos pocos bloques a la vez, que
+    # Arrow analiza en paralelo. `avisar(fase, lote)` se llama al cambiar de fase y con cada lote leído
+    # (vista previa, progreso); si lanza una excepción, la ingesta se interrumpe y no deja archivos.
+    archivo.seek(0, os.SEEK_END)
+    if archivo.tell() == 0:
+        raise pd.errors.EmptyDataError("El archivo CSV está vacío.")
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    tipado = f"{temporal}.tipado"
+    esquema = None
+    try:
+        for relajar in _RELAJACIONES:
+            archivo.seek(0)
+            tipos = relajar(esquema) if relajar is not None else None
+            avisar('Leyendo')
+            try:
+                lector = pacsv.open_csv(
+                    archivo,
+                    read_options=pacsv.ReadOptions(block_size=TAMANO_BLOQUE, encoding=codificacion,
+                                                   use_threads=True),
+                    parse_options=pacsv.ParseOptions(delimiter=delimitador),
+                    # Igual que pandas: las celdas vacías de texto se leen como nulos
+                    convert_options=pacsv.ConvertOptions(column_types=tipos, strings_can_be_null=True),
+                )
+                esquema = lector.schema
+                with pq.ParquetWriter(temporal, esquema) as escritor:
+                    for lote in lector:
+                        escritor.write_batch(lote)
+                        avisar('Leyendo', lote)
+                break
+            except pa.ArrowInvalid as e:
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+                if esquema is None or relajar is _RELAJACIONES[-1]:
+                    raise pd.errors.ParserError(str(e)) from e
+
+        # Inferencia de tipos una sola vez (fechas, booleanos, decimales con coma...) y reescritura tipada
+        avisar('Detectando tipos')
+        tipos = inferir_tipos(temporal)
+        if tipos:
+            aplicar_tipos(temporal, tipado, tipos)
+            os.replace(tipado, temporal)
+        # Cubo de agregación por País × Género, calculado una vez junto al Parquet
+        avisar('Calculando resúmenes')
+        if not os.path.exists(ruta_cubo(destino)):
+            construir_cubo(temporal, ruta_cubo(destino))
+        # Renombrado atómico: otra sesión puede estar ingiriendo el mismo archivo a la vez
+        os.replace(temporal, destino)
+        podar_datos(conservar=destino)
+        return destino
+    finally:
+        for resto in (temporal, tipado):
+            if os.path.exists(resto):
+                os.remove(resto)
+
+
+def podar_datos(conservar=None):
+    # Agrupa los archivos de cada dataset por huella y borra los grupos usados hace más tiempo hasta
+    # quedar bajo LIMITE_DATOS_MB. Los que tienen temporales se están escribiendo y no se tocan.
+    grupos = {}
+    for nombre in os.listdir(DIRECTORIO_DATOS):
+        coincidencia = _ARCHIVO_DATASET.match(nombre)
+        if coincidencia is not None:
+            grupos.setdefault(coincidencia.group(1), []).append(os.path.join(DIRECTORIO_DATOS, nombre))
+    en_uso = {clave for clave, rutas in grupos.items() if any('.tmp' in r for r in rutas)}
+    if conservar is not None:
+        en_uso.add(os.path.basename(conservar).split('.')[0])
+
+    def soltar(clave):
+        # Los DataFrames cacheados pueden ser vistas sobre el archivo mapeado: sin ellos se desmapea
+        _cache_df.descartar(lambda c: c[0] == clave)
+        for ruta in grupos[clave]:
+            if ruta.endswith('.parquet'):
+                cerrar(ruta)
+
+    return podar(grupos, LIMITE_DATOS_MB * 1024 * 1024, conservar=en_uso, al_expulsar=soltar)
+
+
+def _ruta_parquet(clave):
+    return os.path.join(DIRECTORIO_DATOS, f"{clave}.v{VERSION_FORMATO}.parquet")
+
+
+def _asegurar_parquet(clave, abrir, delimitador):
+    ruta = _ruta_parquet(clave)
+    if not os.path.exists(ruta):
+        with abrir() as archivo:
+            ingerir_csv(archivo, delimitador, ruta)
+    return ruta
+
+
+def dataset_estatico(ruta_csv=RUTA_CSV_ESTATICO):
+    clave = huella_archivo(ruta_csv)
+    ruta = _asegurar_parquet(clave, lambda: open(ruta_csv, 'rb'), ',')
+    return {'nombre': os.path.basename(ruta_csv), 'clave': clave, 'ruta': ruta}
+
+
+@functools.lru_cache(maxsize=128)
+def _esquema(ruta):
+    return pq.read_schema(ruta)
+
+
+def columnas_dataset(dataset):
+    return _esquema(dataset['ruta']).names
+
+
+def columnas_numericas(dataset):
+    return [c.name for c in _esquema(dataset['ruta'])
+            if pa.types.is_integer(c.type) or pa.types.is_floating(c.type)]
+
+
+def tipos_dataset(dataset):
+    # Tipos de pandas de cada columna según el esquema del Parquet, sin leer filas
+    return _esquema(dataset['ruta']).empty_table().to_pandas().dtypes
+
+
+def num_filas(dataset):
+    return pq.ParquetFile(dataset['ruta']).metadata.num_rows
+
+
+def _leer(dataset, columnas, filas):
+    # Las columnas y filas pedidas se toman sin copia de la tabla compartida; solo se copia lo que
+    # optimizar_tabla convierte (categorías, enteros reducidos...)
+    tabla = tabla_compartida(dataset, columnas)
+    if filas is None:
+        return optimizar_tabla(tabla)
+    inicio, fin = filas
+    df = optimizar_tabla(tabla.slice(inicio, max(fin - inicio, 0)))
+    df.index = pd.RangeIndex(inicio, inicio + len(df))
+    return df
+
+
+def _memoria_df(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+@instrumentado('lectura')
+def leer_df(dataset, columnas=None, filas=None):
+    # Lee del almacén solo las columnas y filas pedidas, con tipos compactos; el resultado se cachea por huella
+    columnas = list(columnas) if columnas is not None else None
+    clave = (dataset['clave'], tuple(columnas) if columnas is not None else None, filas)
+    df = _cache_df.obtener_o_calcular(clave, lambda: _leer(dataset, columnas, filas), _memoria_df)
+    # Copia superficial: comparte los datos pero añadir o reemplazar columnas en una sesión no afecta al
+    # DataFrame cacheado que ven las demás (ninguna página modifica valores en sitio)
+    return df.copy(deep=False)
+
+
+def obtener_dataset():
+    # Verificar si hay un archivo cargado en el estado de la sesión
+    dataset = st.session_state.get('dataset')
+    if dataset is not None and os.path.exists(dataset['ruta']):
+        # Marca el dataset como usado para que no se borre al superar LIMITE_DATOS_MB
+        tocar(dataset['ruta'])
+        st.success("Datos cargados desde la página principal.")
+        return dataset
+    if dataset is not None:
+        del st.session_state['dataset']
+        st.warning("El archivo cargado ya no está disponible en el servidor. Vuelve a subirlo desde la página principal.")
+
+    ruta_csv = RUTA_CSV_ESTATICO
+    try:
+        dataset = dataset_estatico(ruta_csv)
+        tocar(dataset['ruta'])
+        st.warning("No se ha cargado ningún archivo desde la página principal. Se están utilizando datos estáticos.")
+    except FileNotFoundError:
+        st.error(f"No se encontró el archivo CSV en la ruta: {ruta_csv}")
+        st.stop()
+    except pd.errors.EmptyDataError:
+        st.error("El archivo CSV está vacío.")
+        st.stop()
+    except pd.errors.ParserError:
+        st.error("Error al parsear el archivo CSV. Revisa el formato del archivo.")
+        st.stop()
+    except Exception as e:
+        st.error(f"Ocurrió un error al procesar el archivo: {e}")
+        st.stop()
+    return dataset
@@ -0,0 +1,355 @@
+# herramientas/consulta.py
+#
+# Consultas perezosas sobre el almacén compartido. Una página encadena pasos (filas, filtrar, seleccionar,
+# derivar, eliminar, agrupar) sin calcular nada; al pedir el resultado, el plan se normaliza y se ejecuta
+# una sola vez sobre las columnas Arrow:
+#  - solo se leen las columnas que usan los filtros y las que se muestran (proyección);
+#  - las columnas derivadas que no llegan al resultado no se calculan;
+#  - un filtro de igualdad o 'contiene' sobre una columna original usa su índice invertido (filtros.py);
+#  - las filas seleccionadas tras cada filtro se cachean por prefijo del plan, así que los planes que
+#    comparten los primeros pasos reutilizan ese trabajo, y el resultado se cachea por firma del plan.
+#
+# Además, consulta_sql ejecuta SQL de solo lectura sobre el dataset con DuckDB, si está instalado.
+
+import hashlib
+import importlib.util
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from herramientas.almacen import tabla_compartida
+from herramientas.cache import CacheLRU
+from herramientas.diagnostico import instrumentado
+from herramientas.filtros import buscar_texto, indice_columna, texto_valores
+
+LIMITE_SELECCIONES_MB = 64
+LIMITE_RESULTADOS_MB = 128
+
+# Por debajo de esta fracción de filas ya seleccionadas, un filtro recorre esas filas en vez de usar el índice
+FRACCION_INDICE = 1 / 64
+
+# Filas máximas que se devuelven de una consulta SQL
+LIMITE_FILAS_SQL = 10_000
+
+_cache_selecciones = CacheLRU(LIMITE_SELECCIONES_MB * 1024 * 1024)
+_cache_resultados = CacheLRU(LIMITE_RESULTADOS_MB * 1024 * 1024)
+
+
+# --- Expresiones ---
+
+def _contiene(valores, patron):
+    # Igual que el índice de filtros.py: se busca sobre el texto de los valores distintos y se proyecta a las
+    # filas (los nulos quedan nulos y el filtro los descarta)
+    if isinstance(valores, pa.ChunkedArray):
+        valores = valores.combine_chunks()
+    codificado = valores if pa.types.is_dictionary(valores.type) else pc.dictionary_encode(valores)
+    coincide = buscar_texto(texto_valores(codificado.dictionary), patron)
+    return pc.take(coincide, codificado.indices)
+
+
+def _dividir(a, b):
+    return pc.divide(pc.cast(a, pa.float64()), pc.cast(b, pa.float64()))
+
+
+_OPERACIONES = {
+    '==': pc.equal, '!=': pc.not_equal,
+    '<': pc.less, '<=': pc.less_equal, '>': pc.greater, '>=': pc.greater_equal,
+    '+': pc.add, '-': pc.subtract, '*': pc.multiply, '/': _dividir,
+    '&': pc.and_kleene, '|': pc.or_kleene,
+}
+
+
+class Expresion:
+    # Árbol de expresión sobre columnas. Se construye con col() y lit() y los operadores de Python;
+    # su repr es estable y forma parte de la firma del plan.
+
+    def __init__(self, operacion, *argumentos):
+        self.operacion = operacion
+        self.argumentos = argumentos
+
+    def __repr__(self):
+        if self.operacion == 'col':
+            return f"col({self.argumentos[0]!r})"
+        if self.operacion == 'lit':
+            return repr(self.argumentos[0])
+        return f"{self.operacion}({', '.join(map(repr, self.argumentos))})"
+
+    def columnas(self):
+        if self.operacion == 'col':
+            return {self.argumentos[0]}
+        return set().union(*(a.columnas() for a in self.argumentos if isinstance(a, Expresion)))
+
+    def evaluar(self, resolver):
+        # `resolver(nombre)` devuelve la columna (ChunkedArray) con las filas seleccionadas
+        if self.operacion == 'col':
+            return resolver(self.argumentos[0])
+        if self.operacion == 'lit':
+            return self.argumentos[0]
+        valores = [a.evaluar(resolver) if isinstance(a, Expresion) else a for a in self.argumentos]
+        if self.operacion == '~':
+            return pc.invert(valores[0])
+        if self.operacion == 'es_nulo':
+            return pc.is_null(valores[0])
+        if self.operacion == 'contiene':
+            return _contiene(valores[0], valores[1])
+        if self.operacion == 'en':
+            return pc.is_in(valores[0], value_set=pa.array(valores[1]))
+        return _OPERACIONES[self.operacion](*valores)
+
+    def _binaria(self, operacion, otro):
+        return Expresion(operacion, self, otro if isinstance(otro, Expresion) else lit(otro))
+
+    def __eq__(self, otro): return self._binaria('==', otro)
+    def __ne__(self, otro): return self._binaria('!=', otro)
+    def __lt__(self, otro): return self._binaria('<', otro)
+    def __le__(self, otro): return self._binaria('<=', otro)
+    def __gt__(self, otro): return self._binaria('>', otro)
+    def __ge__(self, otro): return self._binaria('>=', otro)
+    def __add__(self, otro): return self._binaria('+', otro)
+    def __sub__(self, otro): return self._binaria('-', otro)
+    def __mul__(self, otro): return self._binaria('*', otro)
+    def __truediv__(self, otro): return self._binaria('/', otro)
+    def __and__(self, otro): return self._binaria('&', otro)
+    def __or__(self, otro): return self._binaria('|', otro)
+    def __invert__(self): return Expresion('~', self)
+
+    __hash__ = None
+
+    def contiene(self, patron):
+        return Expresion('contiene', self, patron)
+
+    def es_nulo(self):
+        return Expresion('es_nulo', self)
+
+    def en(self, valores):
+        return Expresion('en', self, tuple(valores))
+
+
+def col(nombre):
+    return Expresion('col', nombre)
+
+
+def lit(valor):
+    return Expresion('lit', valor)
+
+
+# --- Plan ---
+
+class Consulta:
+    # Plan inmutable: cada método devuelve una consulta nueva con un paso más
+
+    def __init__(self, dataset, pasos=()):
+        self.dataset = dataset
+        self.pasos = tuple(pasos)
+
+    def _con(self, *paso):
+        if self.pasos and self.pasos[-1][0] == 'agrupar':
+            raise ValueError("Después de agrupar no se pueden añadir más pasos.")
+        return Consulta(self.dataset, self.pasos + (paso,))
+
+    def filas(self, inicio, fin):
+        return self._con('filas', inicio, fin)
+
+    def filtrar(self, condicion):
+        return self._con('filtrar', condicion)
+
+    def seleccionar(self, *columnas):
+        return self._con('seleccionar', columnas)
+
+    def eliminar(self, *columnas):
+        return self._con('eliminar', columnas)
+
+    def derivar(self, nombre, expresion):
+        return self._con('derivar', nombre, expresion)
+
+    def agrupar(self, claves, agregaciones):
+        # agregaciones: {columna: función de Arrow ('mean', 'sum', 'count', 'min', 'max'...) o lista de ellas}
+        pares = tuple((c, f) for c, fs in agregaciones.items() for f in ([fs] if isinstance(fs, str) else fs))
+        return self._con('agrupar', tuple(claves), pares)
+
+    # --- Normalización ---
+
+    def _plan(self):
+        # (pasos que afectan a las filas, columnas visibles, columnas derivadas necesarias, agrupación)
+        visibles = list(tabla_compartida(self.dataset).column_names)
+        derivadas = {}
+        filas = []
+        agrupacion = None
+        for paso in self.pasos:
+            tipo = paso[0]
+            if tipo == 'seleccionar':
+                visibles = list(paso[1])
+            elif tipo == 'eliminar':
+                visibles = [c for c in visibles if c not in paso[1]]
+            elif tipo == 'derivar':
+                derivadas[paso[1]] = paso[2]
+                visibles = [c for c in visibles if c != paso[1]] + [paso[1]]
+            elif tipo == 'agrupar':
+                agrupacion = paso[1:]
+            else:
+                # Los filtros se guardan con las definiciones de las derivadas que usan en ese momento
+                usadas = {}
+                if tipo == 'filtrar':
+                    usadas = _dependencias(paso[1].columnas(), derivadas)
+                filas.append(paso + (tuple(sorted(usadas.items(), key=lambda x: x[0])),))
+
+        salida = visibles if agrupacion is None else list(agrupacion[0]) + [c for c, _ in agrupacion[1]]
+        necesarias = _dependencias(set(salida), derivadas)
+        return tuple(filas), tuple(visibles), necesarias, agrupacion
+
+    @property
+    def firma(self):
+        filas, visibles, necesarias, agrupacion = self._plan()
+        texto = repr((self.dataset['clave'], filas, visibles, sorted(necesarias.items()), agrupacion))
+        return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).hexdigest()
+
+    # --- Ejecución ---
+
+    def posiciones(self):
+        # Posiciones (ordenadas) de las filas que cumplen el plan; None si son todas
+        return _seleccion(self.dataset, self._plan()[0])
+
+    @instrumentado('consulta')
+    def tabla(self):
+        filas, visibles, necesarias, agrupacion = self._plan()
+
+        def calcular():
+            posiciones = _seleccion(self.dataset, filas)
+            resolver = _resolutor(self.dataset, posiciones, necesarias)
+            if agrupacion is None:
+                return pa.table({c: resolver(c) for c in visibles}), posiciones
+            claves, pares = agrupacion
+            columnas = list(dict.fromkeys(list(claves) + [c for c, _ in pares]))
+            datos = pa.table({c: resolver(c) for c in columnas})
+            return datos.group_by(list(claves)).aggregate(list(pares)), None
+
+        clave = ('resultado', self.firma)
+        resultado = _cache_resultados.obtener_o_calcular(
+            clave, calcular, lambda r: r[0].nbytes + (r[1].nbytes if r[1] is not None else 0))
+        return resultado
+
+    def a_pandas(self):
+        # DataFrame del resultado; sin agrupar, el índice son las posiciones originales de las filas
+        tabla, posiciones = self.tabla()
+        df = tabla.to_pandas()
+        if self._plan()[3] is None:
+            df.index = posiciones if posiciones is not None else np.arange(len(df))
+        return df
+
+
+def _dependencias(columnas, derivadas):
+    # Definiciones de las columnas derivadas de las que dependen `columnas` (incluidas las indirectas)
+    resultado = {}
+    pendientes = [c for c in columnas if c in derivadas]
+    while pendientes:
+        nombre = pendientes.pop()
+        if nombre in resultado:
+            continue
+        resultado[nombre] = derivadas[nombre]
+        pendientes.extend(c for c in derivadas[nombre].columnas() if c in derivadas)
+    return resultado
+
+
+def _resolutor(dataset, posiciones, derivadas):
+    # Devuelve las columnas (originales o derivadas) en las filas seleccionadas, leyendo solo las que se piden
+    calculadas = {}
+
+    def resolver(nombre):
+        if nombre not in calculadas:
+            if nombre in derivadas:
+                valores = derivadas[nombre].evaluar(resolver)
+                calculadas[nombre] = valores if isinstance(valores, pa.ChunkedArray) else pa.chunked_array([valores])
+            else:
+                columna = tabla_compartida(dataset, [nombre]).column(0)
+                calculadas[nombre] = columna if posiciones is None else columna.take(pa.array(posiciones))
+        return calculadas[nombre]
+
+    return resolver
+
+
+def _posiciones_indice(dataset, condicion, derivadas):
+    # Posiciones de la condición con el índice invertido de la columna, si la condición lo permite
+    operacion, argumentos = condicion.operacion, condicion.argumentos
+    if operacion == '&':
+        izquierda = _posiciones_indice(dataset, argumentos[0], derivadas)
+        derecha = _posiciones_indice(dataset, argumentos[1], derivadas)
+        if izquierda is None or derecha is None:
+            return None
+        return np.intersect1d(izquierda, derecha, assume_unique=True)
+    columna = argumentos[0] if argumentos else None
+    if not isinstance(columna, Expresion) or columna.operacion != 'col' or columna.argumentos[0] in derivadas:
+        return None
+    if operacion == '==' and argumentos[1].operacion == 'lit':
+        return indice_columna(dataset, columna.argumentos[0]).posiciones_igual(argumentos[1].argumentos[0])
+    if operacion == 'contiene':
+        return indice_columna(dataset, columna.argumentos[0]).posiciones_contiene(argumentos[1])
+    return None
+
+
+def _aplicar(dataset, posiciones, paso):
+    tipo, derivadas = paso[0], dict(paso[-1])
+    if tipo == 'filas':
+        _, inicio, fin = paso[:3]
+        if posiciones is None:
+            total = tabla_compartida(dataset).num_rows
+            return np.arange(max(inicio, 0), min(fin, total))
+        return posiciones[inicio:fin]
+
+    condicion = paso[1]
+    if posiciones is not None and len(posiciones) == 0:
+        return posiciones
+    total = tabla_compartida(dataset).num_rows
+    if posiciones is None or len(posiciones) >= FRACCION_INDICE * total:
+        indice = _posiciones_indice(dataset, condicion, derivadas)
+        if indice is not None:
+            return indice if posiciones is None else np.intersect1d(posiciones, indice, assume_unique=True)
+
+    mascara = condicion.evaluar(_resolutor(dataset, posiciones, derivadas))
+    mascara = pc.fill_null(mascara, False).to_numpy(zero_copy_only=False)
+    return np.flatnonzero(mascara) if posiciones is None else posiciones[mascara]
+
+
+def _seleccion(dataset, pasos_filas):
+    # Cada prefijo del plan se cachea: los planes que empiezan igual reutilizan las filas ya calculadas
+    posiciones = None
+    for i in range(len(pasos_filas)):
+        clave = ('seleccion', dataset['clave'], repr(pasos_filas[:i + 1]))
+        anteriores = posiciones
+        posiciones = _cache_selecciones.obtener_o_calcular(
+            clave, lambda: _aplicar(dataset, anteriores, pasos_filas[i]), lambda p: p.nbytes)
+    return posiciones
+
+
+# --- SQL ---
+
+def sql_disponible():
+    return importlib.util.find_spec('duckdb') is not None
+
+
+@instrumentado('consulta')
+def consulta_sql(dataset, sql, limite=LIMITE_FILAS_SQL):
+    # Ejecuta `sql` sobre la tabla `datos` (el dataset, sin copia) con DuckDB en memoria y sin acceso a
+    # archivos ni red. Devuelve (tabla Arrow con como mucho `limite` filas, si se recortó el resultado).
+    def calcular():
+        import duckdb
+
+        conexion = duckdb.connect(config={'enable_external_access': False})
+        try:
+            conexion.register('datos', tabla_compartida(dataset))
+            resultado = conexion.execute(sql)
+            lector = (resultado.to_arrow_reader(limite) if hasattr(resultado, 'to_arrow_reader')
+                      else resultado.fetch_record_batch(limite))
+            lotes, filas = [], 0
+            for lote in lector:
+                lotes.append(lote)
+                filas += lote.num_rows
+                if filas > limite:
+                    break
+            tabla = pa.Table.from_batches(lotes, schema=lector.schema)
+            return tabla.slice(0, limite), tabla.num_rows > limite
+        finally:
+            conexion.close()
+
+    return _cache_resultados.obtener_o_calcular(('sql', dataset['clave'], sql, limite), calcular,
+                                                lambda r: r[0].nbytes)
@@ -0,0 +1,124 @@
+# herramientas/correlacion.py
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from herramientas.almacen import tabla_compartida
+from herramientas.cache import CacheLRU
+from herramientas.carga import columnas_numericas
+from herramientas.diagnostico import instrumentado
+
+# Filas por bloque al recorrer los datos; la memoria de trabajo es FILAS_POR_BLOQUE x columnas
+FILAS_POR_BLOQUE = 100_000
+
+# A partir de este número de columnas el mapa de calor muestra solo las más correlacionadas
+MAX_COLUMNAS_MAPA = 15
+
+LIMITE_CORRELACIONES_MB = 64
+
+_cache_correlaciones = CacheLRU(LIMITE_CORRELACIONES_MB * 1024 * 1024)
+
+
+class AcumuladorCorrelacion:
+    # Estadísticos suficientes de Pearson por pares de columnas, acumulados bloque a bloque.
+    # Con M la máscara de valores válidos y X0 los datos centrados con ceros en los nulos:
+    #   n = M'M, sx = X0'M, sxx = (X0²)'M, sxy = X0'X0
+    # así cada par usa solo las filas donde ambas columnas tienen valor (como pandas).
+    # Los productos de cada bloque se hacen en float32 y se acumulan en float64.
+
+    def __init__(self, k):
+        self.desplazamiento = None
+        self.filas = 0
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    def agregar(self, bloque):
+        bloque = np.asarray(bloque, dtype='float64')
+        validos = ~np.isnan(bloque)
+        if self.desplazamiento is None:
+            # Centrar con la media del primer bloque reduce la cancelación numérica
+            self.desplazamiento = np.nan_to_num(np.nanmean(bloque, axis=0)) if len(bloque) else 0.0
+        x0 = np.where(validos, bloque - self.desplazamiento, 0.0).astype('float32')
+        m = validos.astype('float32')
+        self.filas += len(bloque)
+        self.n += m.T @ m
+        self.sx += x0.T @ m
+        self.sxx += (x0 * x0).T @ m
+        self.sxy += x0.T @ x0
+
+    def resultado(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self.n * self.sxy - self.sx * self.sx.T
+            var_x = self.n * self.sxx - self.sx ** 2
+            corr = cov / np.sqrt(var_x * var_x.T)
+        corr[self.n < 2] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+        return corr
+
+
+def bloques_parquet(ruta, columnas):
+    archivo = pq.ParquetFile(ruta)
+    for lote in archivo.iter_batches(batch_size=FILAS_POR_BLOQUE, columns=columnas):
+        yield np.column_stack([lote.column(i).to_numpy(zero_copy_only=False).astype('float64', copy=False)
+                               for i in range(lote.num_columns)])
+
+
+def _rangos(columnas_valores):
+    # Spearman = Pearson sobre los rangos. Los rangos necesitan la columna completa,
+    # así que se calculan columna a columna y se guardan en float32.
+    return np.column_stack([pd.Series(v).rank().to_numpy(dtype='float32') for v in columnas_valores])
+
+
+def _calcular(bloques, k, metodo, columnas_completas):
+    acumulador = AcumuladorCorrelacion(k)
+    if metodo == 'spearman':
+        rangos = _rangos(columnas_completas())
+        for inicio in range(0, len(rangos), FILAS_POR_BLOQUE):
+            acumulador.agregar(rangos[inicio:inicio + FILAS_POR_BLOQUE])
+    else:
+        for bloque in bloques:
+            acumulador.agregar(bloque)
+    return acumulador.resultado()
+
+
+@instrumentado('estadísticas')
+def matriz_correlacion(dataset, metodo='pearson'):
+    # Correlación entre las columnas numéricas, recorriendo el Parquet por bloques (sin cargarlo entero)
+    columnas = columnas_numericas(dataset)
+
+    def calcular():
+        if not columnas:
+            return pd.DataFrame()
+        bloques = bloques_parquet(dataset['ruta'], columnas)
+        completas = lambda: (tabla_compartida(dataset, [c]).column(0).to_numpy() for c in columnas)
+        corr = _calcular(bloques, len(columnas), metodo, completas)
+        return pd.DataFrame(corr, index=columnas, columns=columnas)
+
+    clave = (dataset['clave'], metodo, tuple(columnas))
+    return _cache_correlaciones.obtener_o_calcular(clave, calcular, lambda c: c.memory_usage().sum())
+
+
+def _orden_espectral(absoluta):
+    # Ordena las columnas por el vector de Fiedler del laplaciano: las muy correlacionadas quedan juntas
+    if len(absoluta) < 3:
+        return np.arange(len(absoluta))
+    laplaciano = np.diag(absoluta.sum(axis=1)) - absoluta
+    _, vectores = np.linalg.eigh(laplaciano)
+    return np.argsort(vectores[:, 1])
+
+
+def preparar_mapa(corr, max_columnas=MAX_COLUMNAS_MAPA):
+    # Para tablas anchas se quedan las columnas con mayor correlación media absoluta, agrupadas por similitud,
+    # de modo que las anotaciones del mapa de calor sigan siendo legibles
+    if len(corr) <= max_columnas:
+        return corr
+    absoluta = corr.abs().fillna(0.0)
+    fuerza = absoluta.sum() - np.diag(absoluta)
+    elegidas = fuerza.nlargest(max_columnas).index
+    sub = absoluta.loc[elegidas, elegidas].to_numpy()
+    orden = elegidas[_orden_espectral(sub)]
+    return corr.loc[orden, orden]
@@ -0,0 +1,304 @@
+# herramientas/cubos.py
+#
+# Cubos de agregación sobre las dimensiones de baja cardinalidad (País × Género). Se calculan al ingerir
+# el dataset y guardan, por cada combinación de dimensiones (celda):
+#  - filas y primera fila en la que aparece (para conservar el orden de aparición, como unique());
+#  - por cada columna numérica: conteo, suma, suma de cuadrados, mínimo y máximo;
+#  - un boceto de cuantiles con cubetas logarítmicas sobre la distancia de cada valor al mínimo de su celda
+#    (error acotado por PRECISION_CUANTILES respecto a esa distancia, no al valor: un desplazamiento grande
+#    de los datos, como Peso ≈ 1000 ± 1, no hace perder precisión).
+# Todo es sumable entre celdas: los totales por País, por Género o globales se obtienen combinando celdas.
+# Las consultas dependen solo del número de celdas, no del número de filas del dataset.
+
+import functools
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from herramientas.diagnostico import instrumentado
+
+DIMENSIONES = ['País', 'Género']
+
+# Si las dimensiones tienen más combinaciones que esto, no se construye el cubo
+LIMITE_CELDAS = 10_000
+
+# Error máximo de los cuantiles aproximados, relativo a la distancia al mínimo de cada celda
+PRECISION_CUANTILES = 0.01
+
+# Se incluye en el nombre del directorio del cubo; al cambiar su contenido, los cubos antiguos se ignoran
+VERSION_CUBO = 2
+
+CUANTILES = [0.25, 0.5, 0.75]
+
+# Valores con magnitud menor que esta se cuentan como cero en el boceto
+_MINIMO = 1e-9
+
+_GAMMA = (1 + PRECISION_CUANTILES) / (1 - PRECISION_CUANTILES)
+_LOG_GAMMA = np.log(_GAMMA)
+
+_PARTES = ['celdas', 'estadisticas', 'bocetos']
+
+_lock_construccion = threading.Lock()
+
+
+def _cubetas(x):
+    # (signo, k): |x| cae en (gamma^(k-1), gamma^k]
+    signo = np.sign(x).astype(np.int8)
+    magnitud = np.abs(x)
+    signo[magnitud < _MINIMO] = 0
+    k = np.ceil(np.log(np.where(signo != 0, magnitud, 1.0)) / _LOG_GAMMA).astype(np.int32)
+    k[signo == 0] = 0
+    return signo, k
+
+
+def _valor_cubeta(signo, k):
+    # Punto de la cubeta con error relativo como mucho PRECISION_CUANTILES respecto a cualquier valor de ella
+    return signo * 2 * np.power(_GAMMA, k.astype(np.float64)) / (_GAMMA + 1)
+
+
+def _codigos_celda(dimensiones):
+    # Código de celda de cada fila, numerado por orden de primera aparición: se combinan los códigos de
+    # diccionario de cada dimensión (el nulo es un código más) sin convertir el texto a objetos de Python
+    combinado = np.zeros(dimensiones.num_rows, dtype=np.int64)
+    for columna in dimensiones.columns:
+        codificada = pc.dictionary_encode(columna).combine_chunks()
+        tamano = len(codificada.dictionary) + 1
+        codigos = pc.fill_null(codificada.indices, tamano - 1).to_numpy(zero_copy_only=False)
+        combinado = combinado * tamano + codigos
+    return pd.factorize(combinado)[0]
+
+
+def _codigo_boceto(celda, medida, signo, k, num_medidas):
+    # (celda, medida, signo, cubeta) empaquetados en un entero, para agrupar con una sola clave
+    clave = (celda.astype(np.int64) * num_medidas + medida) * 3 + signo + 1
+    return (clave << 32) + (k.astype(np.int64) + 2 ** 31)
+
+
+def _bocetos(codigo, cuenta, num_medidas):
+    clave = codigo >> 32
+    return pd.DataFrame({
+        'celda': (clave // 3 // num_medidas).astype(np.int32),
+        'medida': (clave // 3 % num_medidas).astype(np.int32),
+        'signo': (clave % 3 - 1).astype(np.int8),
+        'k': ((codigo & 0xFFFFFFFF) - 2 ** 31).astype(np.int32),
+        'cuenta': cuenta.astype(np.int64),
+    })
+
+
+_AGREGACIONES = {'conteo': 'sum', 'suma': 'sum', 'cuadrados': 'sum', 'minimo': 'min', 'maximo': 'max'}
+
+
+class Cubo:
+    # celdas: una fila por combinación de dimensiones (su posición es el código de celda).
+    # estadisticas y bocetos: por (celda, medida) y (celda, medida, cubeta), con la medida como
+    # posición en `medidas`; así las partes grandes solo tienen enteros y se agrupan rápido.
+
+    def __init__(self, dimensiones, medidas, celdas, estadisticas, bocetos):
+        self.dimensiones = list(dimensiones)
+        self.medidas = list(medidas)
+        self.celdas = celdas
+        self.estadisticas = estadisticas
+        self.bocetos = bocetos
+
+    @property
+    def nbytes(self):
+        return int(sum(m.memory_usage(deep=True).sum() for m in (self.celdas, self.estadisticas, self.bocetos)))
+
+    @classmethod
+    def de_columnas(cls, dimensiones, columna, medidas):
+        # `dimensiones` es una tabla Arrow con las columnas de dimensión y `columna(nombre)` devuelve cada
+        # medida: así se puede leer una medida cada vez. Cada fila se reduce a su código de celda y las
+        # agregaciones se hacen sobre ese código.
+        grupo = _codigos_celda(dimensiones)
+        n = int(grupo.max()) + 1 if len(grupo) else 0
+        # Con pocas celdas, los códigos caben en 16 bits y argsort estable usa radix sort (lineal)
+        orden = np.argsort(grupo.astype(np.int16) if n <= 2 ** 15 else grupo, kind='stable')
+        limites = np.searchsorted(grupo[orden], np.arange(n))
+        primeras = orden[limites]
+        celdas = dimensiones.take(pa.array(primeras)).to_pandas().assign(
+            filas=np.bincount(grupo, minlength=n), primera=primeras)
+        dimensiones = dimensiones.column_names
+
+        estadisticas, bocetos = [_vacio_estadisticas()], [_bocetos(np.empty(0, np.int64), np.empty(0), 1)]
+        for j, medida in enumerate(medidas):
+            x = columna(medida).cast(pa.float64()).to_numpy(zero_copy_only=False)
+            validos = ~np.isnan(x)
+            g, v = grupo[validos], x[validos]
+            conteo = np.bincount(g, minlength=n)
+            con_datos = np.flatnonzero(conteo)
+            # fmin/fmax ignoran los NaN: mínimo y máximo por celda en una pasada sobre las filas ordenadas
+            ordenados = x[orden]
+            minimos = np.fmin.reduceat(ordenados, limites) if n else np.empty(0)
+            estadisticas.append(pd.DataFrame({
+                'celda': con_datos.astype(np.int32), 'medida': np.int32(j), 'conteo': conteo[con_datos],
+                'suma': np.bincount(g, v, minlength=n)[con_datos],
+                'cuadrados': np.bincount(g, v * v, minlength=n)[con_datos],
+                'minimo': minimos[con_datos],
+                'maximo': np.fmax.reduceat(ordenados, limites)[con_datos] if n else np.empty(0),
+            }))
+            signo, k = _cubetas(v - minimos[g])
+            cuentas = pd.Series(_codigo_boceto(g, j, signo, k, len(medidas))).value_counts(sort=False)
+            bocetos.append(_bocetos(cuentas.index.to_numpy(), cuentas.to_numpy(), len(medidas)))
+
+        return cls(dimensiones, medidas, celdas, _concatenar(estadisticas), _concatenar(bocetos))
+
+    # --- Consultas ---
+
+    def _seleccion(self, filtros):
+        mascara = np.ones(len(self.celdas), dtype=bool)
+        for dimension, valor in (filtros or {}).items():
+            mascara &= (self.celdas[dimension] == valor).to_numpy()
+        return mascara
+
+    def conteo(self, dimension, filtros=None):
+        # Filas por valor de la dimensión (nulos incluidos), en orden de primera aparición
+        celdas = self.celdas[self._seleccion(filtros)]
+        conteo = (celdas.groupby(dimension, dropna=False, sort=False)
+                  .agg(filas=('filas', 'sum'), primera=('primera', 'min')).sort_values('primera'))
+        indice = [None if pd.isna(v) else v for v in conteo.index]
+        return pd.Series(conteo['filas'].to_numpy(), index=pd.Index(indice, dtype=object, name=dimension),
+                         name='count')
+
+    def valores(self, dimension, filtros=None):
+        # Valores presentes (sin nulos) en las celdas que cumplen los filtros, como valores_en()
+        return [v for v in self.conteo(dimension, filtros).index if v is not None]
+
+    def resumen(self, por=(), filtros=None, medidas=None, cuantiles=CUANTILES):
+        # Estadísticas de cada medida agrupadas por las dimensiones `por`, combinando celdas.
+        # El coste depende del número de celdas y cubetas, no de las filas del dataset.
+        por = list(por)
+        if por:
+            grupo = self.celdas.groupby(por, dropna=False, sort=False).ngroup().to_numpy()
+        else:
+            grupo = np.zeros(len(self.celdas), dtype=np.int64)
+        grupo = np.where(self._seleccion(filtros), grupo, -1)
+        elegidas = np.arange(len(self.medidas)) if medidas is None else [self.medidas.index(m) for m in medidas]
+
+        def preparar(marco):
+            marco = marco.assign(grupo=grupo[marco['celda'].to_numpy()])
+            return marco[(marco['grupo'] >= 0) & marco['medida'].isin(elegidas)]
+
+        e = preparar(self.estadisticas).groupby(['grupo', 'medida']).agg(_AGREGACIONES)
+        n = e['conteo'].astype('float64')
+        varianza = (e['cuadrados'] - e['suma'] ** 2 / n) / (n - 1)
+        resumen = pd.DataFrame({
+            'count': e['conteo'],
+            'mean': e['suma'] / n,
+            'std': np.sqrt(varianza.clip(lower=0)),
+            'min': e['minimo'],
+        })
+
+        # Cuantiles: cada cubeta vale el mínimo de su celda más su distancia representativa; como en pandas
+        # (interpolación lineal), se interpola entre los valores de las posiciones ⌊h⌋ y ⌊h⌋ + 1, h = q·(n - 1)
+        b = preparar(self.bocetos).merge(self.estadisticas[['celda', 'medida', 'minimo']], on=['celda', 'medida'])
+        b['valor'] = b['minimo'] + _valor_cubeta(b['signo'].to_numpy(), b['k'].to_numpy())
+        b = b.groupby(['grupo', 'medida', 'valor'])['cuenta'].sum().reset_index()
+        cuentas = b.groupby(['grupo', 'medida'], sort=False)['cuenta']
+        acumulado, total = cuentas.cumsum(), cuentas.transform('sum')
+
+        def en_posicion(posicion):
+            return b[acumulado > posicion].groupby(['grupo', 'medida'])['valor'].first()
+
+        for q in cuantiles:
+            h = q * (total - 1)
+            bajo, alto = en_posicion(np.floor(h)), en_posicion(np.minimum(np.floor(h) + 1, total - 1))
+            fraccion = (h - np.floor(h)).groupby([b['grupo'], b['medida']]).first()
+            valores = bajo + (alto - bajo) * fraccion
+            # El punto de la cubeta puede caer fuera del rango real de los datos
+            resumen[f'{q:.0%}'] = valores.reindex(resumen.index).clip(e['minimo'], e['maximo'])
+        resumen['max'] = e['maximo']
+        resumen['sum'] = e['suma']
+
+        # Índice legible: valores de las dimensiones del grupo y nombre de la medida
+        grupos, medidas_fila = resumen.index.get_level_values(0), resumen.index.get_level_values(1)
+        validas = np.flatnonzero(grupo >= 0)
+        claves = self.celdas.iloc[validas].assign(grupo=grupo[validas]).drop_duplicates('grupo').set_index('grupo')
+        niveles = [claves[d].reindex(grupos).to_numpy() for d in por]
+        niveles.append(np.asarray(self.medidas, dtype=object)[medidas_fila])
+        resumen.index = pd.MultiIndex.from_arrays(niveles, names=por + ['medida'])
+        return resumen
+
+    # --- Disco ---
+
+    def guardar(self, ruta):
+        # Un Parquet por parte, en un directorio que se renombra entero al terminar
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(temporal, exist_ok=True)
+        try:
+            pd.DataFrame({'medida': self.medidas}, dtype=object).to_parquet(
+                os.path.join(temporal, 'medidas.parquet'), index=False)
+            for parte in _PARTES:
+                getattr(self, parte).to_parquet(os.path.join(temporal, f'{parte}.parquet'), index=False)
+            try:
+                os.rename(temporal, ruta)
+            except OSError:
+                # Otro proceso lo guardó antes; su cubo es el mismo
+                pass
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+        return ruta
+
+    @classmethod
+    def cargar(cls, ruta):
+        partes = {p: pd.read_parquet(os.path.join(ruta, f'{p}.parquet')) for p in _PARTES}
+        medidas = pd.read_parquet(os.path.join(ruta, 'medidas.parquet'))['medida'].tolist()
+        dimensiones = [c for c in partes['celdas'].columns if c not in ('filas', 'primera')]
+        return cls(dimensiones, medidas, partes['celdas'], partes['estadisticas'], partes['bocetos'])
+
+
+def _vacio_estadisticas():
+    return pd.DataFrame({'celda': np.empty(0, np.int32), 'medida': np.empty(0, np.int32),
+                         'conteo': np.empty(0, np.int64), 'suma': np.empty(0), 'cuadrados': np.empty(0),
+                         'minimo': np.empty(0), 'maximo': np.empty(0)})
+
+
+def _concatenar(marcos):
+    return pd.concat(marcos, ignore_index=True)
+
+
+def ruta_cubo(ruta_parquet):
+    return os.path.splitext(ruta_parquet)[0] + f'.c{VERSION_CUBO}.cubo'
+
+
+@instrumentado('cubos')
+def construir_cubo(ruta_parquet, destino):
+    # Como en perfil.py, en memoria solo hay una medida del Parquet a la vez (además de las dimensiones).
+    # Devuelve None si el dataset no tiene dimensiones o si tienen demasiadas combinaciones.
+    esquema = pq.read_schema(ruta_parquet)
+    dimensiones = [d for d in DIMENSIONES if d in esquema.names]
+    medidas = [c.name for c in esquema if c.name not in dimensiones
+               and (pa.types.is_integer(c.type) or pa.types.is_floating(c.type))]
+    if not dimensiones:
+        return None
+
+    claves = pq.read_table(ruta_parquet, columns=dimensiones)
+    celdas = claves.group_by(dimensiones).aggregate([]).num_rows
+    if celdas > LIMITE_CELDAS:
+        return None
+    cubo = Cubo.de_columnas(claves, lambda nombre: pq.read_table(ruta_parquet, columns=[nombre]).column(0),
+                            medidas)
+    cubo.guardar(destino)
+    return cubo
+
+
+@functools.lru_cache(maxsize=32)
+def _cubo(ruta_parquet):
+    destino = ruta_cubo(ruta_parquet)
+    if os.path.exists(destino):
+        return Cubo.cargar(destino)
+    # Datasets ingeridos antes de que existieran los cubos: se construye al primer uso
+    with _lock_construccion:
+        if os.path.exists(destino):
+            return Cubo.cargar(destino)
+        return construir_cubo(ruta_parquet, destino)
+
+
+def cubo_dataset(dataset):
+    # Cubo del dataset, o None si no tiene dimensiones de baja cardinalidad
+    return _cubo(dataset['ruta'])
@@ -0,0 +1,219 @@
+# herramientas/diagnostico.py
+#
+# Instrumentación opcional de cada rerun: tiempo y memoria de las etapas costosas (carga del CSV,
+# tipos, filtrado, estadísticas, figuras, serialización de tablas...). Desactivada, cada etapa solo
+# cuesta una comprobación.
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+ACTIVADO = os.environ.get('DIAGNOSTICO', '') == '1'
+
+# tracemalloc ralentiza todo el proceso, no solo la sesión que lo pide: ?diagnostico=1 en la URL solo se
+# atiende si el servidor lo permite expresamente
+PERMITIR_URL = os.environ.get('DIAGNOSTICO_URL', '') == '1'
+
+# Reruns que se conservan por sesión para el historial y la traza exportada
+MAX_RERUNS = 20
+
+# Cada sesión ejecuta su script en su propio hilo: la traza del rerun en curso es local al hilo
+_estado = threading.local()
+
+_MB = 1024 * 1024
+
+# Hilo del rerun -> traza abierta. tracemalloc se detiene cuando no queda ninguna (si lo arrancó este módulo).
+_trazas_abiertas = {}
+_lock_trazas = threading.Lock()
+_tracemalloc_propio = False
+
+
+class Traza:
+    # Etapas de un rerun, con el tiempo relativo al inicio del rerun y la memoria de cada una
+
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.fecha = time.time()
+        self.inicio = time.perf_counter()
+        self.duracion = None
+        self.etapas = []
+        self._pila = []
+
+    def _entrar(self, nombre, categoria):
+        # La memoria de tracemalloc es de todo el proceso: con varias sesiones a la vez es aproximada
+        actual, pico = tracemalloc.get_traced_memory()
+        if self._pila:
+            self._pila[-1]['pico'] = max(self._pila[-1]['pico'], pico)
+        # Reiniciar el pico borraría el de las demás sesiones trazadas: solo se hace si esta es la única
+        with _lock_trazas:
+            if len(_trazas_abiertas) <= 1:
+                tracemalloc.reset_peak()
+        etapa = {
+            'nombre': nombre,
+            'categoria': categoria,
+            'nivel': len(self._pila),
+            'inicio': time.perf_counter(),
+            'memoria': actual,
+            'pico': actual,
+            'arrow': pa.total_allocated_bytes(),
+        }
+        self._pila.append(etapa)
+        return etapa
+
+    def _salir(self, etapa):
+        fin = time.perf_counter()
+        actual, pico = tracemalloc.get_traced_memory()
+        self._pila.pop()
+        pico = max(pico, etapa['pico'])
+        if self._pila:
+            self._pila[-1]['pico'] = max(self._pila[-1]['pico'], pico)
+        self.etapas.append({
+            'nombre': etapa['nombre'],
+            'categoria': etapa['categoria'],
+            'nivel': etapa['nivel'],
+            'inicio_ms': (etapa['inicio'] - self.inicio) * 1000,
+            'duracion_ms': (fin - etapa['inicio']) * 1000,
+            'memoria_pico_mb': (pico - etapa['memoria']) / _MB,
+            'memoria_neta_mb': (actual - etapa['memoria']) / _MB,
+            'arrow_neta_mb': (pa.total_allocated_bytes() - etapa['arrow']) / _MB,
+        })
+
+    def terminar(self):
+        if self.duracion is None:
+            self.duracion = (time.perf_counter() - self.inicio) * 1000
+
+    def tabla(self):
+        # En orden de inicio, con las etapas anidadas sangradas bajo la que las contiene
+        etapas = sorted(self.etapas, key=lambda e: e['inicio_ms'])
+        return pd.DataFrame({
+            'Etapa': ['· ' * e['nivel'] + e['nombre'] for e in etapas],
+            'Categoría': [e['categoria'] for e in etapas],
+            'Tiempo (ms)': [e['duracion_ms'] for e in etapas],
+            'Memoria pico (MB)': [e['memoria_pico_mb'] for e in etapas],
+            'Δ Arrow (MB)': [e['arrow_neta_mb'] for e in etapas],
+        })
+
+
+def _abrir_traza(traza):
+    global _tracemalloc_propio
+    with _lock_trazas:
+        for h in [h for h in _trazas_abiertas if not h.is_alive()]:
+            del _trazas_abiertas[h]
+        _trazas_abiertas[threading.current_thread()] = traza
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_propio = True
+
+
+def _cerrar_trazas(hilo=None):
+    # Cierra la traza del hilo dado y las de reruns que terminaron sin llegar a mostrar_panel (st.stop,
+    # excepciones); sin trazas abiertas se detiene tracemalloc, salvo con DIAGNOSTICO=1, que traza siempre
+    global _tracemalloc_propio
+    with _lock_trazas:
+        for h in [h for h in _trazas_abiertas if h is hilo or not h.is_alive()]:
+            del _trazas_abiertas[h]
+        if not _trazas_abiertas and _tracemalloc_propio and not ACTIVADO:
+            tracemalloc.stop()
+            _tracemalloc_propio = False
+
+
+def iniciar(pagina):
+    # Se llama al principio de cada página: abre la traza del rerun si el diagnóstico está activado, con
+    # DIAGNOSTICO=1 para todas las sesiones o, si el servidor se lanzó con DIAGNOSTICO_URL=1, añadiendo
+    # ?diagnostico=1 a la URL
+    activar = ACTIVADO or (PERMITIR_URL and st.query_params.get('diagnostico') == '1')
+    _estado.traza = Traza(pagina) if activar else None
+    if not activar:
+        _cerrar_trazas(threading.current_thread())
+        return None
+    _abrir_traza(_estado.traza)
+    historial = st.session_state.setdefault('diagnostico', [])
+    historial.append(_estado.traza)
+    del historial[:-MAX_RERUNS]
+    return _estado.traza
+
+
+@contextmanager
+def etapa(nombre, categoria='página'):
+    traza = getattr(_estado, 'traza', None)
+    if traza is None:
+        yield
+        return
+    registro = traza._entrar(nombre, categoria)
+    try:
+        yield
+    finally:
+        traza._salir(registro)
+
+
+def instrumentado(categoria):
+    # Decorador: registra cada llamada a la función como una etapa de la categoría indicada
+    def decorar(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if getattr(_estado, 'traza', None) is None:
+                return funcion(*args, **kwargs)
+            with etapa(funcion.__name__, categoria):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorar
+
+
+def mostrar_tabla(datos, **kwargs):
+    # st.dataframe serializa la tabla a Arrow dentro de la llamada: así queda medido
+    with etapa('st.dataframe', 'serialización'):
+        return st.dataframe(datos, **kwargs)
+
+
+def traza_chrome(trazas):
+    # Formato "Trace Event" de Chrome, que abren chrome://tracing y https://ui.perfetto.dev.
+    # Cada rerun es un hilo distinto; los tiempos están en microsegundos desde el primer rerun.
+    eventos = []
+    origen = min((t.fecha for t in trazas), default=0)
+    for numero, traza in enumerate(trazas):
+        base = (traza.fecha - origen) * 1e6
+        eventos.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': numero,
+                        'args': {'name': f"{numero + 1}. {traza.pagina}"}})
+        eventos.append({'name': traza.pagina, 'cat': 'rerun', 'ph': 'X', 'pid': 1, 'tid': numero,
+                        'ts': base, 'dur': (traza.duracion or 0) * 1000})
+        for e in traza.etapas:
+            eventos.append({
+                'name': e['nombre'], 'cat': e['categoria'], 'ph': 'X', 'pid': 1, 'tid': numero,
+                'ts': base + e['inicio_ms'] * 1000, 'dur': e['duracion_ms'] * 1000,
+                'args': {'memoria_pico_mb': round(e['memoria_pico_mb'], 3),
+                         'memoria_neta_mb': round(e['memoria_neta_mb'], 3),
+                         'arrow_neta_mb': round(e['arrow_neta_mb'], 3)},
+            })
+    return json.dumps({'traceEvents': eventos, 'displayTimeUnit': 'ms'})
+
+
+def mostrar_panel():
+    # Se llama al final de cada página: muestra el rerun actual y el historial en la barra lateral
+    traza = getattr(_estado, 'traza', None)
+    if traza is None:
+        return
+    traza.terminar()
+    _estado.traza = None
+    _cerrar_trazas(threading.current_thread())
+
+    historial = st.session_state.get('diagnostico', [])
+    with st.sidebar.expander("Diagnóstico de rendimiento", expanded=True):
+        st.write(f"**Rerun actual:** {traza.duracion:,.0f} ms")
+        if traza.etapas:
+            st.dataframe(traza.tabla().style.format(precision=1), hide_index=True)
+        st.write("**Últimos reruns:**")
+        st.dataframe(pd.DataFrame({
+            'Página': [t.pagina for t in historial],
+            'Tiempo (ms)': [t.duracion for t in historial],
+            'Etapas': [len(t.etapas) for t in historial],
+        }).style.format(precision=0), hide_index=True)
+        st.download_button("Exportar traza (JSON)", traza_chrome(historial),
+                           file_name='traza_rendimiento.json', mime='application/json')
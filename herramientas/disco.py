@@ -0,0 +1,71 @@
+# herramientas/disco.py
+#
+# Límite de espacio para los archivos que la aplicación deja en disco (exportaciones, datasets ingeridos).
+# Cada entrada es un grupo de rutas que se borran juntas; al superar el límite se expulsan las usadas
+# hace más tiempo (la fecha de modificación hace de último uso: `tocar` la actualiza en cada acierto).
+
+import os
+import shutil
+
+
+def tocar(ruta):
+    try:
+        os.utime(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def tamano(ruta):
+    if os.path.isdir(ruta):
+        total = 0
+        for raiz, _, archivos in os.walk(ruta):
+            for nombre in archivos:
+                try:
+                    total += os.path.getsize(os.path.join(raiz, nombre))
+                except FileNotFoundError:
+                    pass
+        return total
+    try:
+        return os.path.getsize(ruta)
+    except FileNotFoundError:
+        return 0
+
+
+def _uso(rutas):
+    usos = []
+    for ruta in rutas:
+        try:
+            usos.append(os.path.getmtime(ruta))
+        except FileNotFoundError:
+            pass
+    return max(usos, default=0.0)
+
+
+def _borrar(ruta):
+    if os.path.isdir(ruta):
+        shutil.rmtree(ruta, ignore_errors=True)
+    else:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+
+def podar(grupos, limite_bytes, conservar=(), al_expulsar=None):
+    # grupos: clave -> rutas de la entrada. `al_expulsar(clave)` se llama antes de borrar sus archivos
+    # (para soltar lo que los tenga abiertos). Devuelve las claves expulsadas.
+    tamanos = {clave: sum(tamano(r) for r in rutas) for clave, rutas in grupos.items()}
+    total = sum(tamanos.values())
+    expulsadas = []
+    for clave in sorted(grupos, key=lambda c: _uso(grupos[c])):
+        if total <= limite_bytes:
+            break
+        if clave in conservar:
+            continue
+        if al_expulsar is not None:
+            al_expulsar(clave)
+        for ruta in grupos[clave]:
+            _borrar(ruta)
+        total -= tamanos[clave]
+        expulsadas.append(clave)
+    return expulsadas
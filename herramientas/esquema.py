@@ -0,0 +1,165 @@
+# herramientas/esquema.py
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from herramientas.diagnostico import instrumentado
+
+# Valores no nulos que se examinan por columna para proponer un tipo
+TAMANO_MUESTRA = 2000
+
+# Clave en los metadatos del Parquet donde se guarda el tipo detectado de cada columna
+CLAVE_METADATOS = b'act_pan.tipos'
+
+VALORES_VERDADEROS = ['true', 'verdadero', 'sí', 'si', 'yes', 's', 'y']
+VALORES_FALSOS = ['false', 'falso', 'no', 'n']
+
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%m/%d/%Y',
+                  '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S']
+
+_PATRON_ENTERO = r'^\s*[+-]?\d+\s*$'
+_PATRON_DECIMAL_PUNTO = r'^\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$'
+# Formato local con coma decimal y punto (opcional) como separador de miles: 1,75 / 1.234,5
+_PATRON_DECIMAL_COMA = r'^\s*[+-]?(\d+|\d{1,3}(\.\d{3})+)(,\d+)?\s*$'
+
+
+def _hilos():
+    return min(os.cpu_count() or 1, 8)
+
+
+# --- Conversores: cada uno recibe un array de texto y devuelve el array convertido ---
+
+def _a_entero(columna):
+    return pc.cast(pc.utf8_trim_whitespace(columna), pa.int64())
+
+
+def _a_decimal_punto(columna):
+    return pc.cast(pc.utf8_trim_whitespace(columna), pa.float64())
+
+
+def _a_decimal_coma(columna):
+    texto = pc.replace_substring(pc.utf8_trim_whitespace(columna), '.', '')
+    return pc.cast(pc.replace_substring(texto, ',', '.'), pa.float64())
+
+
+def _a_booleano(columna):
+    minusculas = pc.utf8_lower(pc.utf8_trim_whitespace(columna))
+    return pc.if_else(pc.is_in(minusculas, pa.array(VALORES_VERDADEROS)), True,
+                      pc.if_else(pc.is_in(minusculas, pa.array(VALORES_FALSOS)), False, None))
+
+
+def _a_fecha(formato):
+    return lambda columna: pc.strptime(pc.utf8_trim_whitespace(columna), format=formato, unit='s')
+
+
+# --- Validadores: True si todos los valores no nulos del array encajan en el tipo ---
+
+def _cumple_patron(patron):
+    return lambda columna: pc.all(pc.match_substring_regex(pc.drop_null(columna), patron)).as_py() is not False
+
+
+def _es_booleano(columna):
+    minusculas = pc.utf8_lower(pc.utf8_trim_whitespace(pc.drop_null(columna)))
+    return pc.all(pc.is_in(minusculas, pa.array(VALORES_VERDADEROS + VALORES_FALSOS))).as_py() is not False
+
+
+def _es_fecha(formato):
+    def validar(columna):
+        valores = pc.drop_null(columna)
+        convertidas = pc.strptime(pc.utf8_trim_whitespace(valores), format=formato, unit='s', error_is_null=True)
+        return convertidas.null_count == 0
+    return validar
+
+
+# Candidatos en orden de preferencia: (nombre del tipo, validador, conversor)
+CANDIDATOS = [
+    ('entero', _cumple_patron(_PATRON_ENTERO), _a_entero),
+    ('decimal', _cumple_patron(_PATRON_DECIMAL_PUNTO), _a_decimal_punto),
+    ('decimal (coma)', _cumple_patron(_PATRON_DECIMAL_COMA), _a_decimal_coma),
+    ('booleano', _es_booleano, _a_booleano),
+] + [(f'fecha ({f})', _es_fecha(f), _a_fecha(f)) for f in FORMATOS_FECHA]
+
+
+def _muestra(archivo, nombre):
+    # Valores del primer y del último row group, para no depender solo del principio del archivo
+    grupos = sorted({0, archivo.num_row_groups - 1})
+    partes = [archivo.read_row_group(i, columns=[nombre]).column(0) for i in grupos]
+    valores = pc.drop_null(pa.chunked_array([c for p in partes for c in p.chunks], type=partes[0].type))
+    return valores.slice(0, TAMANO_MUESTRA)
+
+
+def _proponer(archivo, nombre):
+    muestra = _muestra(archivo, nombre)
+    if len(muestra) == 0:
+        return []
+    return [c for c in CANDIDATOS if c[1](muestra)]
+
+
+@instrumentado('tipos')
+def inferir_tipos(ruta):
+    # Tipo de cada columna de texto del Parquet, validado contra todas las filas.
+    # Devuelve {columna: (nombre del tipo, conversor)} solo para las columnas que cambian de tipo.
+    archivo = pq.ParquetFile(ruta)
+    if archivo.num_row_groups == 0:
+        return {}
+    texto = [c.name for c in archivo.schema_arrow if pa.types.is_string(c.type) or pa.types.is_large_string(c.type)]
+
+    with ThreadPoolExecutor(_hilos()) as hilos:
+        propuestas = dict(zip(texto, hilos.map(lambda c: _proponer(archivo, c), texto)))
+        propuestas = {c: p for c, p in propuestas.items() if p}
+
+        # Recorrido completo: se descarta cada candidato en cuanto un row group no encaja
+        for i in range(archivo.num_row_groups):
+            if not propuestas:
+                break
+            grupo = archivo.read_row_group(i, columns=list(propuestas))
+            def filtrar(nombre):
+                columna = grupo.column(nombre)
+                return nombre, [c for c in propuestas[nombre] if c[1](columna)]
+            propuestas = {c: p for c, p in hilos.map(filtrar, list(propuestas)) if p}
+
+    return {c: (p[0][0], p[0][2]) for c, p in propuestas.items()}
+
+
+@instrumentado('tipos')
+def aplicar_tipos(origen, destino, tipos):
+    # Reescribe el Parquet row group a row group convirtiendo en paralelo las columnas indicadas
+    archivo = pq.ParquetFile(origen)
+    metadatos = {CLAVE_METADATOS: json.dumps({c: t[0] for c, t in tipos.items()}).encode('utf-8')}
+
+    def convertir(nombre, columna):
+        if nombre not in tipos:
+            return columna
+        return pa.chunked_array([tipos[nombre][1](c) for c in columna.chunks])
+
+    escritor = None
+    try:
+        with ThreadPoolExecutor(_hilos()) as hilos:
+            for i in range(archivo.num_row_groups):
+                grupo = archivo.read_row_group(i)
+                columnas = list(hilos.map(convertir, grupo.column_names, grupo.columns))
+                tabla = pa.Table.from_arrays(columnas, names=grupo.column_names)
+                if escritor is None:
+                    esquema = tabla.schema.with_metadata(metadatos)
+                    escritor = pq.ParquetWriter(destino, esquema)
+                escritor.write_table(tabla.cast(esquema))
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def esquema_dataset(dataset):
+    # Tabla con el tipo físico de cada columna y el tipo detectado en la ingesta (si se convirtió)
+    archivo = pq.ParquetFile(dataset['ruta'])
+    metadatos = archivo.schema_arrow.metadata or {}
+    detectados = json.loads(metadatos[CLAVE_METADATOS]) if CLAVE_METADATOS in metadatos else {}
+    return pd.DataFrame({
+        'Tipo': [str(c.type) for c in archivo.schema_arrow],
+        'Detectado en la carga': [detectados.get(c.name, '') for c in archivo.schema_arrow],
+    }, index=archivo.schema_arrow.names)
@@ -0,0 +1,102 @@
+# herramientas/exportar.py
+
+import gzip
+import hashlib
+import io
+import os
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from herramientas.almacen import tabla_compartida
+from herramientas.carga import DIRECTORIO_DATOS
+from herramientas.diagnostico import instrumentado
+from herramientas.disco import podar, tocar
+
+DIRECTORIO_EXPORTACIONES = os.path.join(DIRECTORIO_DATOS, 'exportaciones')
+
+# Espacio máximo de las exportaciones en disco; al superarlo se borran las descargadas hace más tiempo
+LIMITE_EXPORTACIONES_MB = int(os.environ.get('LIMITE_EXPORTACIONES_MB', '1024'))
+
+# Filas que se serializan a la vez; la memoria extra de la exportación queda acotada a un bloque
+FILAS_POR_BLOQUE = 100_000
+
+# Formato -> (extensión, tipo MIME)
+FORMATOS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV comprimido (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def _bloques(tabla, posiciones):
+    # Bloques de la tabla compartida (solo las filas seleccionadas): cada uno se toma al serializarlo
+    total = tabla.num_rows if posiciones is None else len(posiciones)
+    for inicio in range(0, max(total, 1), FILAS_POR_BLOQUE):
+        if posiciones is None:
+            yield inicio, tabla.slice(inicio, FILAS_POR_BLOQUE)
+        else:
+            yield inicio, tabla.take(pa.array(posiciones[inicio:inicio + FILAS_POR_BLOQUE]))
+
+
+def _escribir_csv(tabla, posiciones, salida):
+    # salida es un archivo binario; se escribe por bloques con la cabecera solo en el primero
+    texto = io.TextIOWrapper(salida, encoding='utf-8', newline='')
+    for inicio, bloque in _bloques(tabla, posiciones):
+        bloque.to_pandas().to_csv(texto, header=(inicio == 0), index=False)
+    texto.flush()
+    texto.detach()
+
+
+def _escribir_parquet(tabla, posiciones, ruta):
+    with pq.ParquetWriter(ruta, tabla.schema) as escritor:
+        for _, bloque in _bloques(tabla, posiciones):
+            escritor.write_table(bloque)
+
+
+def escribir_exportacion(tabla, posiciones, formato, ruta):
+    if formato == 'CSV':
+        with open(ruta, 'wb') as salida:
+            _escribir_csv(tabla, posiciones, salida)
+    elif formato == 'CSV comprimido (gzip)':
+        with gzip.open(ruta, 'wb', compresslevel=6) as salida:
+            _escribir_csv(tabla, posiciones, salida)
+    elif formato == 'Parquet':
+        _escribir_parquet(tabla, posiciones, ruta)
+    else:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+
+
+def firma_exportacion(dataset, filtros, formato):
+    # Identifica una exportación por dataset, filtros aplicados y formato
+    texto = repr((dataset['clave'], tuple(filtros), formato)).encode('utf-8')
+    return hashlib.blake2b(texto, digest_size=16).hexdigest()
+
+
+@instrumentado('exportación')
+def exportar(dataset, posiciones, filtros, formato):
+    # Genera el archivo en disco (solo si no existe ya) y devuelve su ruta. `posiciones` son las filas que
+    # cumplen `filtros` (None: todas); se leen de la tabla compartida bloque a bloque, sin copiar el resultado.
+    extension, _ = FORMATOS[formato]
+    ruta = os.path.join(DIRECTORIO_EXPORTACIONES, f"{firma_exportacion(dataset, filtros, formato)}.{extension}")
+    if os.path.exists(ruta):
+        tocar(ruta)
+        return ruta
+    os.makedirs(DIRECTORIO_EXPORTACIONES, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        escribir_exportacion(tabla_compartida(dataset), posiciones, formato, temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    _podar_exportaciones(ruta)
+    return ruta
+
+
+def _podar_exportaciones(conservar):
+    # Los temporales son exportaciones en curso: no cuentan ni se borran
+    rutas = [os.path.join(DIRECTORIO_EXPORTACIONES, n) for n in os.listdir(DIRECTORIO_EXPORTACIONES)
+             if not n.endswith('.tmp')]
+    podar({r: [r] for r in rutas}, LIMITE_EXPORTACIONES_MB * 1024 * 1024, conservar=(conservar,))
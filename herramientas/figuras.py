@@ -0,0 +1,45 @@
+# herramientas/figuras.py
+
+import io
+
+import streamlit as st
+
+from herramientas.cache import CacheLRU
+from herramientas.diagnostico import instrumentado
+from herramientas.perezoso import importar_perezoso
+
+# Memoria máxima para las imágenes PNG ya renderizadas (compartida por todas las sesiones)
+LIMITE_FIGURAS_MB = 64
+
+DPI = 100
+
+_cache_figuras = CacheLRU(LIMITE_FIGURAS_MB * 1024 * 1024)
+
+# matplotlib solo se importa cuando hay que renderizar una figura que no está en caché
+_figura = importar_perezoso('matplotlib.figure')
+
+
+@instrumentado('figuras')
+def renderizar_png(dibujar, figsize=None):
+    # Se usa una Figure independiente de pyplot: no queda registrada en el estado global,
+    # así que no hay figuras abiertas que se acumulen entre reruns.
+    fig = _figura.Figure(figsize=figsize)
+    try:
+        dibujar(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+def figura_png(dataset, tipo, parametros, dibujar, figsize=None):
+    # Bytes PNG de un gráfico, identificados por (dataset, tipo de gráfico, parámetros)
+    clave = (dataset['clave'], tipo, parametros, figsize)
+    return _cache_figuras.obtener_o_calcular(clave, lambda: renderizar_png(dibujar, figsize), len)
+
+
+@instrumentado('figuras')
+def mostrar_figura(dataset, tipo, parametros, dibujar, figsize=None):
+    # Sustituto de st.pyplot: solo se vuelve a dibujar si cambian los datos o los parámetros
+    st.image(figura_png(dataset, tipo, parametros, dibujar, figsize), use_column_width=True)
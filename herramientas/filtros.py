@@ -0,0 +1,95 @@
+# herramientas/filtros.py
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from herramientas.cache import CacheLRU
+from herramientas.carga import leer_df
+from herramientas.diagnostico import instrumentado
+
+# Memoria máxima para los índices de columnas
+LIMITE_INDICES_MB = 256
+
+_cache_indices = CacheLRU(LIMITE_INDICES_MB * 1024 * 1024)
+
+
+def texto_valores(valores):
+    # Texto de los valores distintos (sin nulos) para buscar subcadenas: str() de cada valor, como en pandas
+    # (70.0 -> '70.0', True -> 'True'). Con y sin índice se usa este mismo texto, así que `contiene` devuelve
+    # las mismas filas por cualquier camino.
+    if isinstance(valores, pa.Array):
+        if pa.types.is_string(valores.type) or pa.types.is_large_string(valores.type):
+            return pc.cast(valores, pa.string())
+        valores = pd.Index(valores.to_pandas())
+    # astype(str) tras map: con cero valores, map conserva el tipo original (int64...)
+    return pa.array(valores.map(str).astype(str), type=pa.string())
+
+
+def buscar_texto(texto, subcadena):
+    # Como str.contains: el patrón se interpreta como expresión regular sin distinguir mayúsculas y, si no
+    # es válida, como texto literal
+    try:
+        return pc.match_substring_regex(texto, subcadena, ignore_case=True)
+    except pa.ArrowInvalid:
+        return pc.match_substring(texto, subcadena, ignore_case=True)
+
+
+class IndiceColumna:
+    # Índice de una columna sobre sus valores distintos:
+    #  - codigos: para cada fila, la posición de su valor en `valores` (-1 si es nulo)
+    #  - índice invertido (valor -> filas), construido con un único argsort
+    #  - texto de los valores distintos, para buscar subcadenas sin convertir la columna entera a str
+
+    def __init__(self, serie):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.cat.codes.to_numpy()
+            valores = serie.cat.categories
+        else:
+            codigos, valores = pd.factorize(serie)
+            valores = pd.Index(valores)
+        self.codigos = codigos.astype(np.int32, copy=False)
+        self.valores = valores
+        self._posicion_valor = {v: i for i, v in enumerate(valores.tolist())}
+        self.texto = texto_valores(valores)
+
+        self.orden = np.argsort(self.codigos, kind='stable')
+        self.limites = np.searchsorted(self.codigos[self.orden], np.arange(len(valores) + 1))
+
+    @property
+    def nbytes(self):
+        return self.codigos.nbytes + self.orden.nbytes + self.limites.nbytes + self.texto.nbytes
+
+    def posiciones_igual(self, valor):
+        i = self._posicion_valor.get(valor)
+        if i is None:
+            return np.empty(0, dtype=self.orden.dtype)
+        # Gracias al argsort estable, las filas de cada valor ya están ordenadas
+        return self.orden[self.limites[i]:self.limites[i + 1]]
+
+    def posiciones_contiene(self, subcadena):
+        # Se busca solo sobre los valores distintos y se proyecta a las filas con los códigos
+        coincide = buscar_texto(self.texto, subcadena).to_numpy(zero_copy_only=False)
+        # El último elemento extra (False) es el que indexan los nulos (código -1), como na=False
+        return np.flatnonzero(np.append(coincide, False)[self.codigos])
+
+    def valores_en(self, posiciones=None):
+        # Valores presentes en las filas dadas, en orden de primera aparición (como unique())
+        codigos = self.codigos if posiciones is None else self.codigos[posiciones]
+        presentes = pd.unique(codigos)
+        return self.valores[presentes[presentes >= 0]].tolist()
+
+
+def indice_columna(dataset, columna):
+    return _cache_indices.obtener_o_calcular(
+        (dataset['clave'], columna),
+        lambda: IndiceColumna(leer_df(dataset, [columna])[columna]),
+        lambda indice: indice.nbytes,
+    )
+
+
+@instrumentado('filtrado')
+def valores_presentes(dataset, columna):
+    # Valores de la columna en orden de primera aparición, sin nulos
+    return indice_columna(dataset, columna).valores_en(None)
@@ -0,0 +1,172 @@
+# herramientas/ingesta.py
+#
+# Ingesta de los CSV subidos en segundo plano. Cada archivo se procesa en un hilo propio (la página sigue
+# respondiendo y muestra el avance), con progreso por bytes leídos, vista previa de las primeras filas en
+# cuanto se leen y cancelación. Los trabajos son del proceso: si la misma subida se vuelve a pedir (rerun,
+# otra pestaña, un reintento del usuario), se reutiliza el trabajo en curso en vez de empezar otro.
+
+import os
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+
+from herramientas.carga import TAMANO_BLOQUE, _ruta_parquet, detectar_formato, huella_flujo, ingerir_csv
+
+# Filas que se muestran como vista previa mientras sigue la ingesta
+FILAS_VISTA_PREVIA = 20
+
+# Trabajos terminados que se recuerdan (los que siguen en curso no se descartan nunca)
+MAX_TRABAJOS = 32
+
+_lock = threading.Lock()
+
+# file_id de la subida -> Trabajo
+_trabajos = OrderedDict()
+
+# Huella del contenido -> Trabajo que lo está ingiriendo
+_en_curso = {}
+
+
+class IngestaCancelada(Exception):
+    pass
+
+
+class _LectorConProgreso:
+    # Envuelve el archivo subido: cuenta los bytes que lee Arrow y corta la lectura si se cancela
+
+    def __init__(self, archivo, trabajo):
+        self._archivo = archivo
+        self._trabajo = trabajo
+
+    def read(self, n=-1):
+        self._trabajo._comprobar()
+        datos = self._archivo.read(n)
+        self._trabajo._leidos_archivo = self._archivo.tell()
+        return datos
+
+    def __getattr__(self, nombre):
+        return getattr(self._archivo, nombre)
+
+
+class Trabajo:
+
+    def __init__(self, archivo, file_id, nombre):
+        self.file_id = file_id
+        self.nombre = nombre
+        archivo.seek(0, os.SEEK_END)
+        self.total = archivo.tell()
+        archivo.seek(0)
+        self.leidos = 0
+        self._leidos_archivo = 0
+        self._lotes = 0
+        self.fase = 'En cola'
+        self.vista_previa = None
+        self.dataset = None
+        self.error = None
+        self._cancelar = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar, args=(archivo,), daemon=True,
+                                      name=f'ingesta-{nombre}')
+
+    @property
+    def progreso(self):
+        return min(self.leidos / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def cancelado(self):
+        return self._cancelar.is_set() and self.dataset is None and self.error is None
+
+    @property
+    def terminado(self):
+        return not self._hilo.is_alive()
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def esperar(self, segundos=None):
+        self._hilo.join(segundos)
+
+    def _comprobar(self):
+        if self._cancelar.is_set():
+            raise IngestaCancelada()
+
+    def _leido(self, n):
+        self._comprobar()
+        self.leidos += n
+
+    def _avisar(self, fase, lote=None):
+        self._comprobar()
+        if fase != self.fase:
+            self.fase = fase
+            self.leidos = 0 if fase == 'Leyendo' else self.total
+            self._lotes = 0
+        if lote is not None:
+            # Arrow lee por delante del análisis: cada lote sale de un bloque de TAMANO_BLOQUE bytes, así que
+            # lo ya analizado son los lotes recibidos por el tamaño de bloque (sin pasar de lo ya leído)
+            self._lotes += 1
+            self.leidos = min(self._lotes * TAMANO_BLOQUE, self._leidos_archivo)
+            if self.vista_previa is None:
+                self.vista_previa = pa.Table.from_batches([lote]).slice(0, FILAS_VISTA_PREVIA).to_pandas()
+
+    def _ejecutar(self, archivo):
+        try:
+            self.fase = 'Comprobando el archivo'
+            clave = huella_flujo(archivo, self._leido)
+            ruta = _ruta_parquet(clave)
+
+            # Si otra sesión está ingiriendo el mismo contenido, se espera a que termine
+            with _lock:
+                otro = _en_curso.get(clave)
+                if otro is None:
+                    _en_curso[clave] = self
+            if otro is not None:
+                self.fase = 'Esperando a otra carga del mismo archivo'
+                while not otro.terminado:
+                    self._comprobar()
+                    self.leidos, self.total = otro.leidos, otro.total
+                    self.vista_previa = otro.vista_previa
+                    otro.esperar(0.2)
+                if otro.error is not None:
+                    raise otro.error
+
+            try:
+                if not os.path.exists(ruta):
+                    self.fase = 'Detectando el formato'
+                    delimitador, codificacion = detectar_formato(archivo)
+                    ingerir_csv(_LectorConProgreso(archivo, self), delimitador, ruta, codificacion,
+                                avisar=self._avisar)
+            finally:
+                with _lock:
+                    if _en_curso.get(clave) is self:
+                        del _en_curso[clave]
+
+            self.dataset = {'file_id': self.file_id, 'nombre': self.nombre, 'clave': clave, 'ruta': ruta}
+            self.fase = 'Terminado'
+        except IngestaCancelada:
+            self.fase = 'Cancelado'
+        except Exception as e:
+            self.error = e
+            self.fase = 'Error'
+
+
+def ingesta_subida(uploaded_file, reiniciar=False):
+    # Trabajo de ingesta de la subida; se crea y arranca la primera vez que se pide (o si `reiniciar`)
+    with _lock:
+        trabajo = _trabajos.get(uploaded_file.file_id)
+        if trabajo is not None and not reiniciar:
+            _trabajos.move_to_end(uploaded_file.file_id)
+            return trabajo
+        trabajo = Trabajo(uploaded_file, uploaded_file.file_id, uploaded_file.name)
+        _trabajos[uploaded_file.file_id] = trabajo
+        terminados = [k for k, t in _trabajos.items() if t.terminado and t is not trabajo]
+        for k in terminados[:max(len(_trabajos) - MAX_TRABAJOS, 0)]:
+            del _trabajos[k]
+        trabajo._hilo.start()
+    return trabajo
+
+
+def cancelar_ingesta(file_id):
+    with _lock:
+        trabajo = _trabajos.get(file_id)
+    if trabajo is not None:
+        trabajo.cancelar()
@@ -0,0 +1,66 @@
+# herramientas/memoria.py
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from herramientas.cache import CacheLRU
+from herramientas.diagnostico import instrumentado
+
+# Una columna de texto pasa a categórica si tiene menos valores distintos que esta fracción de filas
+UMBRAL_CATEGORIA = 0.5
+
+LIMITE_INFORMES_MB = 16
+
+_cache_informes = CacheLRU(LIMITE_INFORMES_MB * 1024 * 1024)
+
+
+def _optimizar_columna(columna):
+    tipo = columna.type
+    if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+        # Texto con pocos valores distintos (País, Género) -> categórica; el resto -> string respaldado por Arrow
+        if len(columna) and pc.count_distinct(columna).as_py() < UMBRAL_CATEGORIA * len(columna):
+            return columna.dictionary_encode().to_pandas()
+        return columna.to_pandas(types_mapper={tipo: pd.StringDtype('pyarrow')}.get)
+
+    serie = columna.to_pandas()
+    if pd.api.types.is_integer_dtype(serie):
+        return pd.to_numeric(serie, downcast='integer')
+    if pd.api.types.is_float_dtype(serie):
+        # Solo se pasa a float32 si todos los valores se representan exactamente
+        reducida = serie.astype('float32')
+        if np.array_equal(reducida.to_numpy(dtype='float64'), serie.to_numpy(), equal_nan=True):
+            return reducida
+    return serie
+
+
+@instrumentado('tipos')
+def optimizar_tabla(tabla):
+    # Convierte una tabla Arrow a DataFrame con los tipos más compactos posibles
+    return pd.DataFrame({nombre: _optimizar_columna(tabla.column(nombre)) for nombre in tabla.column_names})
+
+
+@instrumentado('estadísticas')
+def informe_memoria(dataset, df):
+    # Memoria profunda por columna con los tipos por defecto de pandas frente a los tipos optimizados
+    def calcular():
+        filas = []
+        for col in df.columns:
+            original = pq.read_table(dataset['ruta'], columns=[col]).column(0).to_pandas()
+            antes = original.memory_usage(index=False, deep=True)
+            despues = df[col].memory_usage(index=False, deep=True)
+            filas.append({
+                'Columna': col,
+                'Tipo original': str(original.dtype),
+                'Tipo optimizado': str(df[col].dtype),
+                'Antes (KB)': antes / 1024,
+                'Después (KB)': despues / 1024,
+                'Ahorro (%)': 100 * (1 - despues / antes) if antes else 0.0,
+            })
+            del original
+        return pd.DataFrame(filas).set_index('Columna')
+
+    return _cache_informes.obtener_o_calcular(dataset['clave'], calcular,
+                                              lambda i: int(i.memory_usage(deep=True).sum()))
@@ -0,0 +1,105 @@
+# herramientas/pca.py
+
+import numpy as np
+import pandas as pd
+
+from herramientas.cache import CacheLRU
+from herramientas.carga import columnas_numericas
+from herramientas.correlacion import AcumuladorCorrelacion, bloques_parquet
+from herramientas.diagnostico import instrumentado
+from herramientas.reduccion import PRESUPUESTO_PUNTOS, reducir_puntos
+
+LIMITE_PCA_MB = 64
+
+_cache_pca = CacheLRU(LIMITE_PCA_MB * 1024 * 1024)
+
+
+class ModeloPCA:
+    # PCA sobre datos estandarizados (equivalente a StandardScaler + PCA de scikit-learn).
+    # Se ajusta en una sola pasada por bloques: la matriz de covarianza de los datos estandarizados
+    # se obtiene de los estadísticos suficientes (sumas y productos cruzados) y se diagonaliza (k x k).
+    # Los nulos se imputan con la media de la columna (0 tras estandarizar).
+
+    def __init__(self, columnas, media, escala, componentes, varianza, varianza_total):
+        self.columnas = columnas
+        self.media = media
+        self.escala = escala
+        self.componentes = componentes
+        self.varianza = varianza
+        self.ratio_varianza = varianza / varianza_total if varianza_total > 0 else np.zeros_like(varianza)
+
+    @property
+    def nbytes(self):
+        return self.media.nbytes + self.escala.nbytes + self.componentes.nbytes + self.varianza.nbytes
+
+    def transformar(self, bloque):
+        z = (np.asarray(bloque, dtype='float64') - self.media) / self.escala
+        z = np.nan_to_num(z, nan=0.0).astype('float32')
+        return z @ self.componentes.T.astype('float32')
+
+    def varianza_explicada(self):
+        nombres = [f'Componente {i + 1}' for i in range(len(self.varianza))]
+        return pd.DataFrame({
+            'Varianza explicada': self.varianza,
+            'Proporción': self.ratio_varianza,
+            'Proporción acumulada': np.cumsum(self.ratio_varianza),
+        }, index=nombres)
+
+
+def _ajustar(columnas, bloques, n_componentes):
+    acumulador = AcumuladorCorrelacion(len(columnas))
+    for bloque in bloques:
+        acumulador.agregar(bloque)
+
+    n = np.diag(acumulador.n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Medias y desviaciones (ddof=0, como StandardScaler) sobre los valores no nulos de cada columna
+        desplazada = np.diag(acumulador.sx) / n
+        varianza = np.diag(acumulador.sxx) / n - desplazada ** 2
+    util = (n > 1) & (varianza > 0)
+    if util.sum() == 0:
+        return None
+
+    idx = np.flatnonzero(util)
+    a = desplazada[idx]
+    escala = np.sqrt(varianza[idx])
+    sx = acumulador.sx[np.ix_(idx, idx)]
+    # Productos cruzados centrados en la media global, solo con filas donde ambas columnas tienen valor
+    centrados = (acumulador.sxy[np.ix_(idx, idx)] - sx * a[np.newaxis, :] - sx.T * a[:, np.newaxis]
+                 + acumulador.n[np.ix_(idx, idx)] * np.outer(a, a))
+    covarianza = centrados / np.outer(escala, escala) / max(acumulador.filas - 1, 1)
+
+    valores, vectores = np.linalg.eigh(covarianza)
+    orden = np.argsort(valores)[::-1][:n_componentes]
+    componentes = vectores[:, orden].T
+    # Mismo criterio de signo que scikit-learn: la mayor carga de cada componente es positiva
+    signos = np.sign(componentes[np.arange(len(orden)), np.abs(componentes).argmax(axis=1)])
+    componentes *= signos[:, np.newaxis]
+
+    media = acumulador.desplazamiento[idx] + a
+    return ModeloPCA([columnas[i] for i in idx], media, escala, componentes,
+                     valores[orden], valores.sum())
+
+
+@instrumentado('modelos')
+def ajustar_pca(dataset, n_componentes=2):
+    # Sobre las columnas numéricas, recorriendo el Parquet por bloques
+    columnas = columnas_numericas(dataset)
+
+    def calcular():
+        return _ajustar(columnas, bloques_parquet(dataset['ruta'], columnas), n_componentes)
+
+    clave = ('modelo', dataset['clave'], tuple(columnas), n_componentes)
+    return _cache_pca.obtener_o_calcular(clave, calcular, lambda m: m.nbytes if m is not None else 0)
+
+
+@instrumentado('modelos')
+def proyeccion_reducida(dataset, modelo, presupuesto=PRESUPUESTO_PUNTOS):
+    # Proyecta todas las filas por bloques en las dos primeras componentes y reduce los puntos a dibujar
+    def calcular():
+        bloques = bloques_parquet(dataset['ruta'], modelo.columnas)
+        proyeccion = np.concatenate([modelo.transformar(b)[:, :2] for b in bloques]).astype('float64')
+        return reducir_puntos(proyeccion[:, 0], proyeccion[:, 1], 'Componente 1', 'Componente 2', presupuesto)
+
+    clave = ('proyeccion', dataset['clave'], tuple(modelo.columnas), len(modelo.varianza), presupuesto)
+    return _cache_pca.obtener_o_calcular(clave, calcular, lambda p: int(p.memory_usage().sum()))
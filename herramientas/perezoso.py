@@ -0,0 +1,37 @@
+# herramientas/perezoso.py
+
+import importlib
+import sys
+
+
+class ModuloPerezoso:
+    # Sustituye a un módulo pesado (seaborn, matplotlib, scikit-learn...) y solo lo importa
+    # la primera vez que se accede a uno de sus atributos. seaborn, por ejemplo, tarda más de un
+    # segundo en importarse: así las páginas solo lo cargan al dibujar el primer gráfico.
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def _cargar(self):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nombre)
+        return self._modulo
+
+    @property
+    def cargado(self):
+        return self._modulo is not None or self._nombre in sys.modules
+
+    def __getattr__(self, atributo):
+        return getattr(self._cargar(), atributo)
+
+    def __repr__(self):
+        estado = 'cargado' if self.cargado else 'sin cargar'
+        return f"<módulo perezoso '{self._nombre}' ({estado})>"
+
+
+def importar_perezoso(nombre):
+    # Si el módulo ya está importado se devuelve tal cual
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    return ModuloPerezoso(nombre)
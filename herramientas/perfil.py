@@ -0,0 +1,132 @@
+# herramientas/perfil.py
+
+import functools
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from herramientas.cubos import cubo_dataset
+from herramientas.diagnostico import instrumentado
+
+# Número de valores más frecuentes que se guardan por columna
+TOP_K = 50
+
+# Solo se guarda la lista completa de valores únicos si la columna tiene como mucho esta cardinalidad
+LIMITE_UNICOS = 10000
+
+CUANTILES = [0.25, 0.5, 0.75]
+
+
+def _es_numerica(tipo):
+    return pa.types.is_integer(tipo) or pa.types.is_floating(tipo)
+
+
+def _mas_frecuentes(conteos):
+    # Los TOP_K valores más frecuentes sin pasar todos los distintos a Python: select_k da el umbral de
+    # frecuencia y solo los candidatos que lo alcanzan se ordenan (estable: empates por primera aparición)
+    frecuencias = conteos.field('counts')
+    if len(conteos) > TOP_K:
+        seleccion = pc.select_k_unstable(frecuencias, k=TOP_K, sort_keys=[('counts', 'descending')])
+        umbral = pc.min(frecuencias.take(seleccion))
+        conteos = conteos.filter(pc.greater_equal(frecuencias, umbral))
+        frecuencias = conteos.field('counts')
+    orden = np.argsort(-frecuencias.to_numpy(), kind='stable')[:TOP_K]
+    conteos = conteos.take(orden)
+    return pd.Series(conteos.field('counts').to_numpy(), index=conteos.field('values').to_pylist(), name='count')
+
+
+def _perfilar_columna(columna):
+    # Todas las estadísticas de una columna a partir de un único array en memoria
+    perfil = {
+        'tipo': str(columna.type),
+        'conteo': len(columna) - columna.null_count,
+        'nulos': columna.null_count,
+    }
+    min_max = pc.min_max(columna)
+    perfil['min'] = min_max['min'].as_py()
+    perfil['max'] = min_max['max'].as_py()
+
+    if _es_numerica(columna.type) and perfil['conteo']:
+        perfil['media'] = pc.mean(columna).as_py()
+        perfil['std'] = pc.stddev(columna, ddof=1).as_py()
+        perfil['cuantiles'] = dict(zip(CUANTILES, pc.quantile(columna, q=CUANTILES).to_pylist()))
+
+    # value_counts conserva el orden de primera aparición, igual que pandas.unique
+    conteos = pc.value_counts(columna)
+    # Como en pandas, los nulos aparecen en los valores únicos pero no en el conteo ni en la cardinalidad
+    validos = conteos.filter(conteos.field('values').is_valid())
+    perfil['distintos'] = len(validos)
+    if perfil['distintos'] <= LIMITE_UNICOS:
+        perfil['unicos'] = conteos.field('values').to_pylist()
+    perfil['top'] = _mas_frecuentes(validos)
+    return perfil
+
+
+@functools.lru_cache(maxsize=32)
+def _perfilar(ruta):
+    # Un único recorrido por columna: en memoria solo hay una columna del Parquet a la vez
+    esquema = pq.read_schema(ruta)
+    perfil = {}
+    for nombre in esquema.names:
+        columna = pq.read_table(ruta, columns=[nombre]).column(0)
+        perfil[nombre] = _perfilar_columna(columna)
+        del columna
+    return perfil
+
+
+def perfil_dataset(dataset):
+    # La ruta del Parquet incluye la huella del contenido, así que identifica al dataset
+    return _perfilar(dataset['ruta'])
+
+
+@instrumentado('estadísticas')
+def describir(dataset):
+    # Equivalente a df.describe() para las columnas numéricas, servido desde el perfil
+    filas = {}
+    for nombre, p in perfil_dataset(dataset).items():
+        if 'media' not in p:
+            continue
+        filas[nombre] = {
+            'count': p['conteo'],
+            'mean': p['media'],
+            'std': p['std'],
+            'min': p['min'],
+            '25%': p['cuantiles'][0.25],
+            '50%': p['cuantiles'][0.5],
+            '75%': p['cuantiles'][0.75],
+            'max': p['max'],
+        }
+    return pd.DataFrame(filas, dtype='float64')
+
+
+def _cubo_con(dataset, columna):
+    # Cubo del dataset si `columna` es una de sus dimensiones (País, Género)
+    cubo = cubo_dataset(dataset)
+    return cubo if cubo is not None and columna in cubo.dimensiones else None
+
+
+@instrumentado('estadísticas')
+def valores_unicos(dataset, columna):
+    cubo = _cubo_con(dataset, columna)
+    if cubo is not None:
+        return cubo.conteo(columna).index.tolist()
+    p = perfil_dataset(dataset)[columna]
+    if 'unicos' in p:
+        return p['unicos']
+    # Cardinalidad demasiado alta para guardar todos los valores: se muestran los más frecuentes
+    return p['top'].index.tolist()
+
+
+@instrumentado('estadísticas')
+def conteo_valores(dataset, columna):
+    cubo = _cubo_con(dataset, columna)
+    if cubo is not None:
+        conteo = cubo.conteo(columna)
+        conteo = conteo[conteo.index.notna()]
+        return conteo.sort_values(ascending=False, kind='stable').head(TOP_K)
+    serie = perfil_dataset(dataset)[columna]['top'].copy()
+    serie.index.name = columna
+    return serie
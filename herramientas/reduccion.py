@@ -0,0 +1,140 @@
+# herramientas/reduccion.py
+
+import numpy as np
+import pandas as pd
+
+from herramientas.almacen import tabla_compartida
+from herramientas.cache import CacheLRU
+from herramientas.diagnostico import instrumentado
+
+# Número máximo de puntos que se envían al navegador en los gráficos de dispersión
+PRESUPUESTO_PUNTOS = 5000
+
+# Atípicos que se dibujan como máximo en un Box Plot (muestra aleatoria reproducible)
+MAX_ATIPICOS = 500
+
+LIMITE_REDUCCIONES_MB = 64
+
+_cache_reducciones = CacheLRU(LIMITE_REDUCCIONES_MB * 1024 * 1024)
+
+
+def _columna_float(dataset, columna):
+    # Una sola columna del almacén compartido como float64 (los nulos pasan a NaN)
+    return tabla_compartida(dataset, [columna]).column(0).to_numpy().astype('float64', copy=False)
+
+
+def _memoria(resultado):
+    if isinstance(resultado, pd.DataFrame):
+        return int(resultado.memory_usage(deep=True).sum())
+    return sum(getattr(v, 'nbytes', 64) for v in resultado.values())
+
+
+def _cacheado(clave, calcular):
+    return _cache_reducciones.obtener_o_calcular(clave, calcular, _memoria)
+
+
+@instrumentado('reducción')
+def histograma(dataset, columna, bins=30):
+    # Conteos por intervalo calculados en el servidor; al navegador solo llegan `bins` barras
+    def calcular():
+        valores = _columna_float(dataset, columna)
+        valores = valores[np.isfinite(valores)]
+        conteos, bordes = np.histogram(valores, bins=bins)
+        return pd.DataFrame({
+            'Intervalo': (bordes[:-1] + bordes[1:]) / 2,
+            'Frecuencia': conteos,
+        })
+    return _cacheado(('histograma', dataset['clave'], columna, bins), calcular)
+
+
+@instrumentado('reducción')
+def resumen_caja(dataset, columna):
+    # Estadísticos de un Box Plot en el formato de Axes.bxp, con los mismos bigotes (1.5 * IQR) que seaborn
+    def calcular():
+        valores = _columna_float(dataset, columna)
+        valores = valores[np.isfinite(valores)]
+        if len(valores) == 0:
+            return {}
+        q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+        iqr = q3 - q1
+        dentro = valores[(valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)]
+        atipicos = valores[(valores < q1 - 1.5 * iqr) | (valores > q3 + 1.5 * iqr)]
+        if len(atipicos) > MAX_ATIPICOS:
+            atipicos = np.random.default_rng(0).choice(atipicos, MAX_ATIPICOS, replace=False)
+        return {
+            'label': columna,
+            'q1': q1,
+            'med': mediana,
+            'q3': q3,
+            'whislo': dentro.min(),
+            'whishi': dentro.max(),
+            'fliers': atipicos,
+        }
+    return _cacheado(('caja', dataset['clave'], columna), calcular)
+
+
+def lttb(x, y, n):
+    # Largest-Triangle-Three-Buckets: reduce una serie ordenada por x a n puntos conservando su forma
+    total = len(x)
+    if n >= total or n < 3:
+        return np.arange(total)
+    bordes = np.linspace(1, total - 1, n - 1).astype(int)
+    elegidos = np.empty(n, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, total - 1
+    anterior = 0
+    for i in range(n - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # Punto medio del siguiente bucket (o el último punto)
+        sig_inicio, sig_fin = fin, bordes[i + 2] if i + 2 < len(bordes) else total
+        mx, my = x[sig_inicio:sig_fin].mean(), y[sig_inicio:sig_fin].mean()
+        ax, ay = x[anterior], y[anterior]
+        areas = np.abs((ax - mx) * (y[inicio:fin] - ay) - (ax - x[inicio:fin]) * (my - ay))
+        anterior = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = anterior
+    return elegidos
+
+
+def _binning_2d(x, y, presupuesto):
+    # Agrupa los puntos en una rejilla y devuelve el centroide y el número de puntos de cada celda ocupada
+    lado = max(int(np.sqrt(presupuesto)), 1)
+
+    def celda(v):
+        rango = v.max() - v.min()
+        if rango == 0:
+            return np.zeros(len(v), dtype=np.int64)
+        return np.minimum(((v - v.min()) / rango * lado).astype(np.int64), lado - 1)
+
+    celdas = celda(x) * lado + celda(y)
+    ocupadas, inversa, conteo = np.unique(celdas, return_inverse=True, return_counts=True)
+    return (np.bincount(inversa, weights=x) / conteo,
+            np.bincount(inversa, weights=y) / conteo,
+            conteo)
+
+
+@instrumentado('reducción')
+def puntos_dispersion(dataset, columna_x, columna_y, presupuesto=PRESUPUESTO_PUNTOS):
+    # Devuelve como máximo ~presupuesto puntos. Si X está ordenada se usa LTTB (gráfico de línea);
+    # si no, binning 2D con el número de puntos por celda para conservar la densidad.
+    def calcular():
+        x = _columna_float(dataset, columna_x)
+        y = x if columna_y == columna_x else _columna_float(dataset, columna_y)
+        return reducir_puntos(x, y, columna_x, columna_y, presupuesto)
+    return _cacheado(('dispersion', dataset['clave'], columna_x, columna_y, presupuesto), calcular)
+
+
+def reducir_puntos(x, y, nombre_x, nombre_y, presupuesto=PRESUPUESTO_PUNTOS):
+    # Reducción de dos arrays ya calculados (p. ej. una proyección PCA) a ~presupuesto puntos
+    validos = np.isfinite(x) & np.isfinite(y)
+    x, y = x[validos], y[validos]
+    ordenada = bool(len(x) > 1 and np.all(np.diff(x) >= 0))
+    if len(x) <= presupuesto:
+        conteo = np.ones(len(x), dtype=np.int64)
+    elif ordenada:
+        indices = lttb(x, y, presupuesto)
+        x, y, conteo = x[indices], y[indices], np.ones(len(indices), dtype=np.int64)
+    else:
+        x, y, conteo = _binning_2d(x, y, presupuesto)
+    puntos = pd.DataFrame({nombre_x: x, 'Puntos': conteo})
+    puntos[nombre_y] = y
+    puntos.attrs['ordenada'] = ordenada
+    return puntos
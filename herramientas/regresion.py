@@ -0,0 +1,139 @@
+# herramientas/regresion.py
+
+import numpy as np
+import pandas as pd
+
+from herramientas.cache import CacheLRU
+from herramientas.carga import columnas_numericas, num_filas
+from herramientas.correlacion import bloques_parquet
+from herramientas.diagnostico import instrumentado
+from herramientas.reduccion import PRESUPUESTO_PUNTOS
+
+# Fracción de filas reservada para evaluar el modelo (como test_size=0.2)
+FRACCION_PRUEBA = 0.2
+
+LIMITE_REGRESION_MB = 64
+
+_cache_regresion = CacheLRU(LIMITE_REGRESION_MB * 1024 * 1024)
+
+
+def _es_prueba(posiciones):
+    # Partición entrenamiento/prueba determinista por posición de fila (hash multiplicativo),
+    # reproducible bloque a bloque sin barajar los datos
+    h = (posiciones.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return h < np.uint64(FRACCION_PRUEBA * 2 ** 32)
+
+
+class EstadisticosGram:
+    # Matrices de Gram A'A de entrenamiento y prueba, con A = [1, columnas] (desplazadas por la media del
+    # primer bloque para conservar precisión). Contienen X'X, X'y, y'y y las sumas de cualquier subconjunto
+    # de columnas, así que cualquier regresión entre ellas se resuelve sin volver a leer los datos.
+    # Solo se usan las filas sin nulos en `columnas`. Se guarda además una muestra de filas de prueba
+    # para el gráfico de reales vs. predichos.
+
+    def __init__(self, columnas, filas_totales):
+        self.columnas = list(columnas)
+        k = len(self.columnas) + 1
+        self.entrenamiento = np.zeros((k, k))
+        self.prueba = np.zeros((k, k))
+        self.desplazamiento = None
+        self.filas_con_nulos = 0
+        self._paso_muestra = max(int(filas_totales * FRACCION_PRUEBA) // PRESUPUESTO_PUNTOS, 1)
+        self._muestra = []
+        self._posicion = 0
+
+    def agregar(self, bloque):
+        bloque = np.asarray(bloque, dtype='float64')
+        posiciones = np.arange(self._posicion, self._posicion + len(bloque))
+        self._posicion += len(bloque)
+
+        completas = ~np.isnan(bloque).any(axis=1)
+        self.filas_con_nulos += int((~completas).sum())
+        bloque, posiciones = bloque[completas], posiciones[completas]
+        if self.desplazamiento is None and len(bloque):
+            self.desplazamiento = bloque.mean(axis=0)
+        if not len(bloque):
+            return
+
+        a = np.column_stack([np.ones(len(bloque)), bloque - self.desplazamiento])
+        prueba = _es_prueba(posiciones)
+        self.entrenamiento += a[~prueba].T @ a[~prueba]
+        self.prueba += a[prueba].T @ a[prueba]
+
+        elegidas = prueba & (posiciones % self._paso_muestra == 0)
+        self._muestra.append(bloque[elegidas])
+
+    @property
+    def muestra(self):
+        if not self._muestra:
+            return np.empty((0, len(self.columnas)))
+        return np.concatenate(self._muestra)[:PRESUPUESTO_PUNTOS]
+
+    @property
+    def nbytes(self):
+        return self.entrenamiento.nbytes + self.prueba.nbytes + sum(m.nbytes for m in self._muestra)
+
+    def ajustar(self, variable_dependiente, variables_independientes):
+        pos = {c: i + 1 for i, c in enumerate(self.columnas)}
+        idx = [0] + [pos[c] for c in variables_independientes]
+        iy = pos[variable_dependiente]
+
+        g = self.entrenamiento
+        beta = np.linalg.lstsq(g[np.ix_(idx, idx)], g[idx, iy], rcond=None)[0]
+        pendientes = beta[1:]
+        d = self.desplazamiento
+        intercepto = beta[0] + d[iy - 1] - pendientes @ d[[i - 1 for i in idx[1:]]]
+
+        # Métricas sobre la partición de prueba, a partir de su matriz de Gram
+        t = self.prueba
+        n_prueba = t[0, 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sse = t[iy, iy] - 2 * beta @ t[idx, iy] + beta @ t[np.ix_(idx, idx)] @ beta
+            sst = t[iy, iy] - t[0, iy] ** 2 / n_prueba
+            mse = sse / n_prueba
+            r2 = 1 - sse / sst
+
+        muestra = self.muestra
+        reales = muestra[:, iy - 1]
+        predichos = intercepto + muestra[:, [i - 1 for i in idx[1:]]] @ pendientes
+        return {
+            'coeficientes': pd.DataFrame({'Variable': list(variables_independientes), 'Coeficiente': pendientes}),
+            'intercepto': intercepto,
+            'mse': mse,
+            'r2': r2,
+            'n_entrenamiento': int(g[0, 0]),
+            'n_prueba': int(n_prueba),
+            'reales': reales,
+            'predichos': predichos,
+        }
+
+
+def _gram(dataset, columnas):
+    def calcular():
+        estadisticos = EstadisticosGram(columnas, num_filas(dataset))
+        for bloque in bloques_parquet(dataset['ruta'], columnas):
+            estadisticos.agregar(bloque)
+        return estadisticos
+
+    clave = ('gram', dataset['clave'], tuple(columnas))
+    return _cache_regresion.obtener_o_calcular(clave, calcular, lambda e: e.nbytes)
+
+
+@instrumentado('modelos')
+def ajustar_regresion(dataset, variable_dependiente, variables_independientes):
+    # Regresión lineal por mínimos cuadrados. Se acumula una sola matriz de Gram con todas las columnas
+    # numéricas; si no tienen nulos, sirve para cualquier combinación de variables. Si hay nulos, se acumula
+    # (y cachea) la matriz de las columnas elegidas para usar solo las filas completas en esas columnas.
+    variables_independientes = list(variables_independientes)
+    todas = columnas_numericas(dataset)
+
+    def calcular():
+        estadisticos = _gram(dataset, todas)
+        if estadisticos.filas_con_nulos:
+            estadisticos = _gram(dataset, [variable_dependiente] + variables_independientes)
+        if estadisticos.desplazamiento is None:
+            return None
+        return estadisticos.ajustar(variable_dependiente, variables_independientes)
+
+    clave = ('modelo', dataset['clave'], variable_dependiente, tuple(variables_independientes))
+    return _cache_regresion.obtener_o_calcular(clave, calcular, lambda r: r['reales'].nbytes * 2 + 1024 if r is not None else 0)
@@ -0,0 +1,95 @@
+# herramientas/tabla.py
+#
+# Tabla paginada en el servidor: el dataset se queda en el almacén compartido (Arrow) y al navegador
+# solo se envía la página visible. La ordenación usa permutaciones cacheadas por (dataset, columna, sentido).
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+from herramientas.almacen import tabla_compartida
+from herramientas.cache import CacheLRU
+from herramientas.diagnostico import instrumentado, mostrar_tabla
+
+LIMITE_ORDENES_MB = 256
+
+FILAS_POR_PAGINA = [25, 50, 100, 500]
+
+SIN_ORDENAR = "(sin ordenar)"
+
+_cache_ordenes = CacheLRU(LIMITE_ORDENES_MB * 1024 * 1024)
+
+
+def _tipo_posiciones(n):
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+def permutacion_orden(dataset, columna, descendente=False):
+    # (orden, rango): filas en orden de la columna (nulos al final) y la posición de cada fila en ese orden
+    def calcular():
+        tabla = tabla_compartida(dataset)
+        sentido = 'descending' if descendente else 'ascending'
+        tipo = _tipo_posiciones(tabla.num_rows)
+        orden = pc.sort_indices(tabla, sort_keys=[(columna, sentido)], null_placement='at_end')
+        orden = orden.to_numpy().astype(tipo)
+        rango = np.empty_like(orden)
+        rango[orden] = np.arange(len(orden), dtype=tipo)
+        return orden, rango
+
+    return _cache_ordenes.obtener_o_calcular((dataset['clave'], columna, descendente), calcular,
+                                             lambda r: r[0].nbytes + r[1].nbytes)
+
+
+@instrumentado('tabla')
+def filas_vista(dataset, posiciones=None, orden=None, descendente=False):
+    # Filas de la vista en el orden en que se muestran; None si son todas en su orden original.
+    # Con filtro y orden, las filas filtradas se ordenan por su rango en la permutación global.
+    if orden is None:
+        return posiciones
+    permutacion, rango = permutacion_orden(dataset, orden, descendente)
+    if posiciones is None:
+        return permutacion
+    return posiciones[np.argsort(rango[posiciones], kind='stable')]
+
+
+@instrumentado('tabla')
+def ventana(dataset, filas, inicio, n, columnas=None):
+    # Página [inicio, inicio + n) de la vista. Sin filtro ni orden es un slice de la tabla (sin copia);
+    # si no, se toman solo las filas de la página. El índice son las posiciones originales de las filas.
+    tabla = tabla_compartida(dataset, columnas)
+    if filas is None:
+        fin = min(inicio + n, tabla.num_rows)
+        pagina = tabla.slice(inicio, max(fin - inicio, 0))
+        indices = np.arange(inicio, max(fin, inicio))
+    else:
+        indices = np.asarray(filas[inicio:inicio + n])
+        pagina = tabla.take(pa.array(indices))
+    df = pagina.to_pandas()
+    df.index = indices
+    return df
+
+
+def tabla_paginada(dataset, posiciones=None, clave='tabla'):
+    # Muestra la vista (todas las filas o solo `posiciones`) página a página, con orden y columnas
+    # elegidas en el servidor. `clave` distingue los widgets si hay varias tablas en la app.
+    columnas = tabla_compartida(dataset).column_names
+    total = tabla_compartida(dataset).num_rows if posiciones is None else len(posiciones)
+
+    c1, c2, c3 = st.columns([2, 1, 1])
+    orden = c1.selectbox("Ordenar por:", [SIN_ORDENAR] + columnas, key=f'{clave}_orden')
+    descendente = c2.toggle("Descendente", key=f'{clave}_descendente')
+    por_pagina = c3.selectbox("Filas por página:", FILAS_POR_PAGINA, index=1, key=f'{clave}_por_pagina')
+    visibles = st.multiselect("Columnas:", columnas, default=columnas, key=f'{clave}_columnas')
+
+    paginas = max((total + por_pagina - 1) // por_pagina, 1)
+    # Si la vista se ha reducido (nuevo filtro, más filas por página), volver a la primera página
+    if st.session_state.get(f'{clave}_pagina', 1) > paginas:
+        st.session_state[f'{clave}_pagina'] = 1
+    pagina = st.number_input(f"Página (de {paginas:,}):", min_value=1, max_value=paginas, step=1,
+                             key=f'{clave}_pagina')
+
+    filas = filas_vista(dataset, posiciones, None if orden == SIN_ORDENAR else orden, descendente)
+    inicio = (pagina - 1) * por_pagina
+    mostrar_tabla(ventana(dataset, filas, inicio, por_pagina, visibles or None), use_container_width=True)
+    st.caption(f"Filas {min(inicio + 1, total):,}–{min(inicio + por_pagina, total):,} de {total:,}")
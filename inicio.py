@@ -1,12 +1,34 @@
 # inicio.py
 
 import streamlit as st
-import pandas as pd
-from PIL import Image
+
+from herramientas.diagnostico import iniciar, mostrar_panel, mostrar_tabla
+from herramientas.ingesta import cancelar_ingesta, ingesta_subida
+
+# Cada cuánto se actualiza el progreso de la carga (segundos)
+INTERVALO_PROGRESO = 0.5
 
 # Configura la página
 st.set_page_config(page_title="Proyecto Futurista", page_icon="🌌", layout="centered")
 
+iniciar("Inicio")
+
+
+@st.fragment(run_every=INTERVALO_PROGRESO)
+def progreso_ingesta(trabajo):
+    # Solo este fragmento se vuelve a ejecutar mientras dura la carga; al terminar, se recarga la página
+    if trabajo.terminado:
+        st.rerun()
+    st.progress(trabajo.progreso, text=f"{trabajo.fase}: {trabajo.leidos / 1e6:,.1f} de {trabajo.total / 1e6:,.1f} MB")
+    if st.button("Cancelar carga"):
+        trabajo.cancelar()
+        trabajo.esperar()
+        st.rerun()
+    if trabajo.vista_previa is not None:
+        st.write("Primeras filas (la carga continúa):")
+        mostrar_tabla(trabajo.vista_previa)
+
+
 # Estilos en CSS para fondo e imagen
 st.markdown("""
     <style>
@@ -61,21 +83,34 @@ with st.container():
     uploaded_file = st.file_uploader("📂 Sube tu archivo CSV aquí", type=["csv"], accept_multiple_files=False)
     st.markdown('</div>', unsafe_allow_html=True)
 
+    # Si se quita el archivo o se sube otro, la ingesta anterior ya no hace falta
+    anterior = st.session_state.get('ingesta')
+    if anterior is not None and (uploaded_file is None or uploaded_file.file_id != anterior):
+        cancelar_ingesta(anterior)
+        del st.session_state['ingesta']
+
     # Botón para navegar a la página de visualización si se carga un archivo
     if uploaded_file is not None:
-        try:
-            # Detectar el delimitador automáticamente
-            import csv
-            sample = uploaded_file.read(1024).decode('utf-8')
-            dialect = csv.Sniffer().sniff(sample)
-            uploaded_file.seek(0)  # Reiniciar el puntero del archivo
-
-            # Leer el archivo CSV con el delimitador detectado
-            df = pd.read_csv(uploaded_file, delimiter=dialect.delimiter)
+        dataset = st.session_state.get('dataset')
+        if dataset is None or dataset.get('file_id') != uploaded_file.file_id:
+            # La ingesta (huella, formato, lectura a Parquet) corre en segundo plano; la sesión solo guarda
+            # la referencia al dataset cuando termina
+            st.session_state['ingesta'] = uploaded_file.file_id
+            trabajo = ingesta_subida(uploaded_file)
+            if trabajo.dataset is not None:
+                st.session_state['dataset'] = dataset = trabajo.dataset
+            elif trabajo.error is not None:
+                st.error(f"Ocurrió un error al leer el archivo CSV: {trabajo.error}")
+            elif trabajo.cancelado:
+                st.warning("Se canceló la carga del archivo.")
+                if st.button("Volver a cargar"):
+                    ingesta_subida(uploaded_file, reiniciar=True)
+                    st.rerun()
+            else:
+                progreso_ingesta(trabajo)
+
+        if dataset is not None and dataset.get('file_id') == uploaded_file.file_id:
             st.success("Archivo CSV cargado exitosamente!")
-            
-            # Guardar el DataFrame en el estado de la sesión para usarlo en otras páginas
-            st.session_state['uploaded_df'] = df
 
             # Botón para ir a la página de visualización
             st.markdown('<div class="button-container">', unsafe_allow_html=True)
@@ -83,8 +118,8 @@ with st.container():
                 # Informar al usuario que debe seleccionar la página desde la barra lateral
                 st.info("Por favor, selecciona '1_proyecto_integrador' en la barra lateral para ver los datos.")
             st.markdown('</div>', unsafe_allow_html=True)
-        except Exception as e:
-            st.error(f"Ocurrió un error al leer el archivo CSV: {e}")
 
     # Cierra el contenedor futurista
     st.markdown('</div>', unsafe_allow_html=True)
+
+mostrar_panel()
@@ -1,37 +1,30 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from io import StringIO
 
+from herramientas.carga import columnas_dataset, columnas_numericas, leer_df, obtener_dataset
+from herramientas.correlacion import matriz_correlacion, preparar_mapa
+from herramientas.diagnostico import iniciar, mostrar_panel, mostrar_tabla
+from herramientas.figuras import mostrar_figura
+from herramientas.memoria import informe_memoria
+from herramientas.perezoso import importar_perezoso
+from herramientas.perfil import conteo_valores, describir, valores_unicos
+from herramientas.reduccion import PRESUPUESTO_PUNTOS, histograma, puntos_dispersion, resumen_caja
+from herramientas.tabla import tabla_paginada
+
+sns = importar_perezoso('seaborn')
+
+iniciar("Actividad 1")
+
 st.title("Vista de la Base de Datos")
 
-# Verificar si hay un DataFrame cargado en el estado de la sesión
-if 'uploaded_df' in st.session_state:
-    df = st.session_state['uploaded_df']
-    st.success("Datos cargados desde la página principal.")
-else:
-    ruta_csv = '../static/Base_datos.csv'
-
-    try:
-        df = pd.read_csv(ruta_csv)
-        st.warning("No se ha cargado ningún archivo desde la página principal. Se están utilizando datos estáticos.")
-    except FileNotFoundError:
-        st.error(f"No se encontró el archivo CSV en la ruta: {ruta_csv}")
-        st.stop()
-    except pd.errors.EmptyDataError:
-        st.error("El archivo CSV está vacío.")
-        st.stop()
-    except pd.errors.ParserError:
-        st.error("Error al parsear el archivo CSV. Revisa el formato del archivo.")
-        st.stop()
-    except Exception as e:
-        st.error(f"Ocurrió un error al procesar el archivo: {e}")
-        st.stop()
+# Obtener la referencia al dataset (subido desde la página principal o estático).
+# Cada opción lee del almacenamiento en disco solo las columnas y filas que necesita.
+dataset = obtener_dataset()
+columnas = columnas_dataset(dataset)
 
 # Mostrar columnas del DataFrame
 st.write("### Columnas en el DataFrame:")
-st.write(df.columns.tolist())
+st.write(columnas)
 
 st.sidebar.header("Opciones de Visualización")
 opcion = st.sidebar.selectbox("Selecciona una opción:", 
@@ -45,35 +38,42 @@ opcion = st.sidebar.selectbox("Selecciona una opción:",
 
 if opcion == "Vista Completa":
     st.write("### Datos de la Base de Datos:")
-    st.dataframe(df)
+    # Solo se envía al navegador la página visible; orden y columnas se resuelven en el servidor
+    tabla_paginada(dataset, clave='vista_completa')
 
 elif opcion == "Primeras 5 Filas":
     st.write("### Primeras 5 Filas del DataFrame:")
-    st.dataframe(df.head())
+    mostrar_tabla(leer_df(dataset, filas=(0, 5)))
 
 elif opcion == "Información General":
     st.write("### Información General del DataFrame:")
+    df = leer_df(dataset)
     buffer = StringIO()
     df.info(buf=buffer)
     info_text = buffer.getvalue()
     st.text(info_text)
 
+    st.write("### Uso de Memoria por Columna (tipos por defecto vs. optimizados):")
+    informe = informe_memoria(dataset, df)
+    mostrar_tabla(informe.style.format(precision=1))
+    st.write(f"**Total:** {informe['Antes (KB)'].sum():,.1f} KB → {informe['Después (KB)'].sum():,.1f} KB")
+
 elif opcion == "Estadísticas Descriptivas":
     st.write("### Estadísticas Descriptivas de Columnas Numéricas:")
-    st.dataframe(df.describe())
+    mostrar_tabla(describir(dataset))
 
 elif opcion == "Valores Únicos en 'País'":
-    if 'País' in df.columns:
+    if 'País' in columnas:
         st.write("### Valores Únicos en la Columna 'País':")
-        pais_unicos = df['País'].unique()
+        pais_unicos = valores_unicos(dataset, 'País')
         st.write(pais_unicos)
     else:
         st.error("La columna 'País' no existe en el DataFrame.")
 
 elif opcion == "Conteo de 'Género'":
-    if 'Género' in df.columns:
+    if 'Género' in columnas:
         st.write("### Conteo de Ocurrencias en la Columna 'Género':")
-        genero_counts = df['Género'].value_counts()
+        genero_counts = conteo_valores(dataset, 'Género')
         st.write(genero_counts)
     else:
         st.error("La columna 'Género' no existe en el DataFrame.")
@@ -84,7 +84,7 @@ elif opcion == "Visualización de Datos":
                                 ["Dispersión", "Histograma", "Box Plot", "Mapa de Calor"])
 
     # Verificar columnas numéricas
-    num_columns = df.select_dtypes(include=['number']).columns
+    num_columns = columnas_numericas(dataset)
 
     if grafico_tipo == "Dispersión":
         if len(num_columns) < 2:
@@ -92,28 +92,47 @@ elif opcion == "Visualización de Datos":
         else:
             x_axis = st.selectbox("Selecciona la columna para el eje X:", num_columns, key='scatter_x_bd')
             y_axis = st.selectbox("Selecciona la columna para el eje Y:", num_columns, key='scatter_y_bd')
-            st.line_chart(df[[x_axis, y_axis]])
+            presupuesto = st.slider("Máximo de puntos a dibujar:", 500, 50000, PRESUPUESTO_PUNTOS, step=500, key='presupuesto_bd')
+            # Solo se envían al navegador los puntos reducidos en el servidor
+            puntos = puntos_dispersion(dataset, x_axis, y_axis, presupuesto)
+            if puntos.attrs['ordenada']:
+                st.line_chart(puntos, x=x_axis, y=y_axis)
+            else:
+                st.scatter_chart(puntos, x=x_axis, y=y_axis, size='Puntos')
 
     elif grafico_tipo == "Histograma":
         if len(num_columns) == 0:
             st.error("No hay columnas numéricas para mostrar un histograma.")
         else:
             columna = st.selectbox("Selecciona la columna para el histograma:", num_columns, key='hist_col_bd')
-            st.hist_chart(df[columna])
+            bins = st.slider("Número de intervalos:", 5, 100, 30, key='hist_bins_bd')
+            st.bar_chart(histograma(dataset, columna, bins), x='Intervalo', y='Frecuencia')
 
     elif grafico_tipo == "Box Plot":
         if len(num_columns) == 0:
             st.error("No hay columnas numéricas para mostrar un Box Plot.")
         else:
             columna = st.selectbox("Selecciona la columna para el Box Plot:", num_columns, key='box_col_bd')
-            fig, ax = plt.subplots()
-            sns.boxplot(y=df[columna], ax=ax)
-            st.pyplot(fig)
+            resumen = resumen_caja(dataset, columna)
+            if not resumen:
+                st.error("La columna seleccionada no tiene valores numéricos.")
+            else:
+                def dibujar(fig):
+                    fig.subplots().bxp([resumen])
+                mostrar_figura(dataset, 'caja', (columna,), dibujar)
 
     elif grafico_tipo == "Mapa de Calor":
-        if df.corr().empty:
+        metodo = st.radio("Método de correlación:", ["pearson", "spearman"], horizontal=True, key='metodo_corr_bd')
+        # Se calcula una sola vez por dataset y método, sobre las columnas numéricas
+        corr = matriz_correlacion(dataset, metodo)
+        if corr.empty:
             st.error("No se puede generar un mapa de calor debido a la falta de datos numéricos.")
         else:
-            fig, ax = plt.subplots(figsize=(10, 8))
-            sns.heatmap(df.corr(), annot=True, cmap='coolwarm', ax=ax)
-            st.pyplot(fig)
+            mapa = preparar_mapa(corr)
+            if len(mapa) < len(corr):
+                st.info(f"Se muestran las {len(mapa)} columnas más correlacionadas de {len(corr)}.")
+            def dibujar(fig):
+                sns.heatmap(mapa, annot=True, cmap='coolwarm', ax=fig.subplots())
+            mostrar_figura(dataset, 'mapa_calor', (metodo,), dibujar, figsize=(10, 8))
+
+mostrar_panel()
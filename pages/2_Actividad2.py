@@ -1,173 +1,183 @@
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from herramientas.carga import columnas_dataset, columnas_numericas, leer_df, obtener_dataset, tipos_dataset
+from herramientas.consulta import Consulta, col, consulta_sql, sql_disponible
+from herramientas.correlacion import matriz_correlacion, preparar_mapa
+from herramientas.diagnostico import iniciar, mostrar_panel, mostrar_tabla
+from herramientas.esquema import esquema_dataset
+from herramientas.figuras import mostrar_figura
+from herramientas.pca import ajustar_pca, proyeccion_reducida
+from herramientas.perezoso import importar_perezoso
+from herramientas.regresion import ajustar_regresion
+
+sns = importar_perezoso('seaborn')
+
+iniciar("Actividad 2")
 
 st.title("Actividad 2 - Análisis Avanzado")  # Título de la página
 
-# Verificar si hay un DataFrame cargado en el estado de la sesión
-if 'uploaded_df' in st.session_state:
-    df = st.session_state['uploaded_df']
-    st.success("Datos cargados desde la página principal.")
-else:
-    # Ruta al archivo CSV estático 
-    ruta_csv = '../static/Base_datos.csv'  # Ajustada para acceder desde 'pages' a 'static'
-
-    try:
-        df = pd.read_csv(ruta_csv)
-        st.warning("No se ha cargado ningún archivo desde la página principal. Se están utilizando datos estáticos.")
-    except FileNotFoundError:
-        st.error(f"No se encontró el archivo CSV en la ruta: {ruta_csv}")
-        st.stop()
-    except pd.errors.EmptyDataError:
-        st.error("El archivo CSV está vacío.")
-        st.stop()
-    except pd.errors.ParserError:
-        st.error("Error al parsear el archivo CSV. Revisa el formato del archivo.")
-        st.stop()
-    except Exception as e:
-        st.error(f"Ocurrió un error al procesar el archivo: {e}")
-        st.stop()
+# Obtener la referencia al dataset (subido desde la página principal o estático)
+dataset = obtener_dataset()
 
 # Mostrar los primeros datos para verificar la carga
 st.write("### Datos Cargados:")
-st.write(df.head())
+st.write(leer_df(dataset, filas=(0, 5)))
 
-# Mostrar los tipos de datos
+# Mostrar los tipos de datos (inferidos una sola vez al cargar el archivo: números, también con coma
+# decimal, fechas y booleanos), tomados del esquema del Parquet sin leer ninguna fila
 st.write("### Tipos de Datos del DataFrame:")
-st.write(df.dtypes)
-
-# Intentar convertir columnas a numéricas si es posible
-for col in df.columns:
-    df[col] = pd.to_numeric(df[col], errors='ignore')
+st.write(tipos_dataset(dataset).astype(str))
+tipos_detectados = esquema_dataset(dataset)
+if tipos_detectados['Detectado en la carga'].any():
+    st.write("### Tipos Detectados en la Carga:")
+    mostrar_tabla(tipos_detectados)
 
 # Seleccionar solo columnas numéricas
-df_numeric = df.select_dtypes(include=['number'])
+columnas = columnas_dataset(dataset)
+numericas = columnas_numericas(dataset)
 
-if df_numeric.empty:
+if not numericas:
     st.error("No hay columnas numéricas en el DataFrame para calcular la correlación.")
 else:
-    # Aplicar los requerimientos solicitados
+    # Aplicar los requerimientos solicitados. Cada paso es una consulta perezosa: nada se copia hasta
+    # mostrarla, solo se leen las columnas necesarias y los pasos comunes se calculan una vez.
     # 1. Selecciona las filas con índices 5 a 10
-    filas_seleccionadas = df.iloc[5:11]  # 11 es exclusivo
+    filas_seleccionadas = Consulta(dataset).filas(5, 11)  # 11 es exclusivo
     st.write("### Filas Seleccionadas (Índices 5 a 10):")
-    st.dataframe(filas_seleccionadas)
+    mostrar_tabla(filas_seleccionadas.a_pandas())
 
     # 2. Selecciona las columnas 'Producto' y 'Precio'
-    if 'Producto' in df.columns and 'Precio' in df.columns:
-        df_productos_precios = filas_seleccionadas[['Producto', 'Precio']]
+    if 'Producto' in columnas and 'Precio' in columnas:
+        productos_precios = filas_seleccionadas.seleccionar('Producto', 'Precio')
         st.write("### Filas Seleccionadas con 'Producto' y 'Precio':")
-        st.dataframe(df_productos_precios)
+        mostrar_tabla(productos_precios.a_pandas())
+
+        # 3. Filtra las filas donde el 'Precio' es mayor que 100
+        filtrado_precio = productos_precios.filtrar(col('Precio') > 100)
+        st.write("### Filas con 'Precio' Mayor que 100:")
+        mostrar_tabla(filtrado_precio.a_pandas())
+
+        # 4. Crea una nueva columna llamada 'Descuento' con un 10% del 'Precio'
+        con_descuento = filtrado_precio.derivar('Descuento', col('Precio') * 0.1)
+        st.write("### Filas con 'Descuento' Añadido:")
+        mostrar_tabla(con_descuento.a_pandas())
+
+        # 5. Elimina la columna 'Descuento' (el plan resultante es el del paso 3: se reutiliza su resultado)
+        sin_descuento = con_descuento.eliminar('Descuento')
+        st.write("### Filas Después de Eliminar la Columna 'Descuento':")
+        mostrar_tabla(sin_descuento.a_pandas())
     else:
         st.error("Las columnas 'Producto' o 'Precio' no existen en el DataFrame.")
 
-    # 3. Filtra las filas donde el 'Precio' es mayor que 100
-    df_filtrado_precio = df_productos_precios[df_productos_precios['Precio'] > 100]
-    st.write("### Filas con 'Precio' Mayor que 100:")
-    st.dataframe(df_filtrado_precio)
-
-    # 4. Crea una nueva columna llamada 'Descuento' con un 10% del 'Precio'
-    df_filtrado_precio['Descuento'] = df_filtrado_precio['Precio'] * 0.1
-    st.write("### Filas con 'Descuento' Añadido:")
-    st.dataframe(df_filtrado_precio)
-
-    # 5. Elimina la columna 'Descuento' del DataFrame
-    df_filtrado_precio.drop(columns=['Descuento'], inplace=True)
-    st.write("### Filas Después de Eliminar la Columna 'Descuento':")
-    st.dataframe(df_filtrado_precio)
-
     st.sidebar.header("Opciones de Análisis Avanzado")
     opcion = st.sidebar.selectbox("Selecciona una opción:", 
                                   ["Correlación", 
                                    "Distribución de Datos", 
                                    "Análisis de Componentes Principales (PCA)", 
-                                   "Regresión Lineal"])
+                                   "Regresión Lineal",
+                                   "Consulta SQL"])
 
     if opcion == "Correlación":
         st.write("### Matriz de Correlación")
-        corr = df_numeric.corr()
-        fig, ax = plt.subplots(figsize=(10, 8))
-        sns.heatmap(corr, annot=True, cmap='coolwarm', ax=ax)
-        st.pyplot(fig)
+        metodo = st.radio("Método de correlación:", ["pearson", "spearman"], horizontal=True, key='metodo_corr_avanzado')
+        corr = matriz_correlacion(dataset, metodo)
+        mapa = preparar_mapa(corr)
+        if len(mapa) < len(corr):
+            st.info(f"Se muestran las {len(mapa)} columnas más correlacionadas de {len(corr)}.")
+        def dibujar(fig):
+            sns.heatmap(mapa, annot=True, cmap='coolwarm', ax=fig.subplots())
+        mostrar_figura(dataset, 'correlacion', (metodo,), dibujar, figsize=(10, 8))
 
     elif opcion == "Distribución de Datos":
         st.write("### Distribución de Datos por Columna")
-        columna = st.selectbox("Selecciona la columna para visualizar su distribución:", df_numeric.columns, key='dist_col')
-        fig, ax = plt.subplots()
-        sns.histplot(df_numeric[columna].dropna(), kde=True, ax=ax)
-        st.pyplot(fig)
+        columna = st.selectbox("Selecciona la columna para visualizar su distribución:", numericas, key='dist_col')
+        def dibujar(fig):
+            # Solo se lee la columna si la figura no está ya en caché
+            sns.histplot(leer_df(dataset, [columna])[columna].dropna(), kde=True, ax=fig.subplots())
+        mostrar_figura(dataset, 'distribucion', (columna,), dibujar)
 
     elif opcion == "Análisis de Componentes Principales (PCA)":
-        from sklearn.decomposition import PCA
-        from sklearn.preprocessing import StandardScaler
-
         st.write("### Análisis de Componentes Principales (PCA)")
 
-        # Preprocesamiento
-        scaler = StandardScaler()
-        scaled_data = scaler.fit_transform(df_numeric)
+        # Ajuste por bloques sobre el Parquet (estandarizado, nulos imputados con la media); modelo y proyección en caché
+        max_componentes = min(len(numericas), 10)
+        n_componentes = 1
+        if max_componentes > 1:
+            n_componentes = st.slider("Número de componentes:", 1, max_componentes, 2, key='pca_n')
+        modelo = ajustar_pca(dataset, n_componentes)
 
-        # PCA
-        pca = PCA(n_components=2)
-        principal_components = pca.fit_transform(scaled_data)
-        pca_df = pd.DataFrame(data=principal_components, columns=['Componente 1', 'Componente 2'])
+        if modelo is None:
+            st.error("Las columnas numéricas no tienen variación suficiente para calcular el PCA.")
+        else:
+            st.write("#### Varianza Explicada:")
+            mostrar_tabla(modelo.varianza_explicada())
 
-        # Visualización
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.scatterplot(x='Componente 1', y='Componente 2', data=pca_df, ax=ax)
-        ax.set_title('Análisis de Componentes Principales (PCA)')
-        st.pyplot(fig)
+            if len(modelo.varianza) < 2:
+                st.info("Selecciona al menos dos componentes para ver la proyección.")
+            else:
+                # Visualización (puntos reducidos en el servidor; el tamaño indica cuántas filas representa cada uno)
+                pca_df = proyeccion_reducida(dataset, modelo)
+                def dibujar(fig):
+                    ax = fig.subplots()
+                    sns.scatterplot(x='Componente 1', y='Componente 2', size='Puntos', data=pca_df, ax=ax, legend=False)
+                    ax.set_title('Análisis de Componentes Principales (PCA)')
+                mostrar_figura(dataset, 'pca', (n_componentes,), dibujar, figsize=(10, 6))
 
     elif opcion == "Regresión Lineal":
-        from sklearn.model_selection import train_test_split
-        from sklearn.linear_model import LinearRegression
-        from sklearn.metrics import mean_squared_error, r2_score
-
         st.write("### Regresión Lineal")
 
         # Selección de variables
-        columnas = df_numeric.columns.tolist()
-        if len(columnas) < 2:
+        if len(numericas) < 2:
             st.error("Se requieren al menos dos columnas numéricas para realizar una regresión lineal.")
         else:
-            variable_dependiente = st.selectbox("Selecciona la variable dependiente (Y):", columnas, key='reg_y')
-            variables_independientes = st.multiselect("Selecciona las variables independientes (X):", [col for col in columnas if col != variable_dependiente], key='reg_x')
+            variable_dependiente = st.selectbox("Selecciona la variable dependiente (Y):", numericas, key='reg_y')
+            variables_independientes = st.multiselect("Selecciona las variables independientes (X):", [c for c in numericas if c != variable_dependiente], key='reg_x')
 
             if variables_independientes:
-                X = df_numeric[variables_independientes].dropna()
-                Y = df_numeric[variable_dependiente].dropna()
-
-                # Alinear los índices
-                X, Y = X.align(Y, join='inner', axis=0)
-
-                # Dividir en entrenamiento y prueba
-                X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
-
-                # Modelo
-                model = LinearRegression()
-                model.fit(X_train, Y_train)
-                Y_pred = model.predict(X_test)
-
-                # Resultados
-                st.write("#### Coeficientes de la Regresión:")
-                coef_df = pd.DataFrame({
-                    'Variable': variables_independientes,
-                    'Coeficiente': model.coef_
-                })
-                st.dataframe(coef_df)
-
-                st.write("#### Métricas del Modelo:")
-                st.write(f"**Error Cuadrático Medio (MSE):** {mean_squared_error(Y_test, Y_pred):.2f}")
-                st.write(f"**Coeficiente de Determinación (R²):** {r2_score(Y_test, Y_pred):.2f}")
-
-                # Visualización de Predicciones
-                fig, ax = plt.subplots()
-                ax.scatter(Y_test, Y_pred)
-                ax.plot([Y_test.min(), Y_test.max()], [Y_test.min(), Y_test.max()], 'k--', lw=2)
-                ax.set_xlabel('Valores Reales')
-                ax.set_ylabel('Valores Predichos')
-                ax.set_title('Valores Reales vs. Predichos')
-                st.pyplot(fig)
+                # Ajuste a partir de matrices de Gram acumuladas por bloques y cacheadas por dataset:
+                # cambiar la combinación de variables no vuelve a recorrer los datos
+                resultado = ajustar_regresion(dataset, variable_dependiente, variables_independientes)
+
+                if resultado is None:
+                    st.error("No hay filas completas para las variables seleccionadas.")
+                else:
+                    # Resultados
+                    st.write("#### Coeficientes de la Regresión:")
+                    mostrar_tabla(resultado['coeficientes'])
+
+                    st.write("#### Métricas del Modelo:")
+                    st.write(f"**Error Cuadrático Medio (MSE):** {resultado['mse']:.2f}")
+                    st.write(f"**Coeficiente de Determinación (R²):** {resultado['r2']:.2f}")
+
+                    # Visualización de Predicciones (muestra de la partición de prueba)
+                    Y_test, Y_pred = resultado['reales'], resultado['predichos']
+                    def dibujar(fig):
+                        ax = fig.subplots()
+                        ax.scatter(Y_test, Y_pred)
+                        ax.plot([Y_test.min(), Y_test.max()], [Y_test.min(), Y_test.max()], 'k--', lw=2)
+                        ax.set_xlabel('Valores Reales')
+                        ax.set_ylabel('Valores Predichos')
+                        ax.set_title('Valores Reales vs. Predichos')
+                    mostrar_figura(dataset, 'regresion', (variable_dependiente, tuple(variables_independientes)), dibujar)
             else:
                 st.warning("Selecciona al menos una variable independiente para realizar la regresión.")
+
+    elif opcion == "Consulta SQL":
+        st.write("### Consulta SQL")
+        if not sql_disponible():
+            st.info("Las consultas SQL necesitan DuckDB (pip install duckdb).")
+        else:
+            # Solo lectura sobre el dataset compartido: DuckDB no tiene acceso a archivos ni a la red
+            sql = st.text_area("Consulta sobre la tabla `datos`:", "SELECT * FROM datos LIMIT 100", key='sql')
+            if sql.strip():
+                try:
+                    resultado, recortado = consulta_sql(dataset, sql)
+                except Exception as e:
+                    st.error(f"Error en la consulta: {e}")
+                else:
+                    mostrar_tabla(resultado)
+                    if recortado:
+                        st.info(f"Se muestran las primeras {resultado.num_rows:,} filas del resultado.")
+
+mostrar_panel()
@@ -1,74 +1,72 @@
 # pages/3_App1.py
 
+import os
+
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import base64
 from io import StringIO
 
-def descargar_csv(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # Codificar en base64
-    href = f'<a href="data:file/csv;base64,{b64}" download="datos_procesados.csv">Descargar CSV Procesado</a>'
-    return href
+from herramientas.carga import columnas_dataset, columnas_numericas, leer_df, obtener_dataset
+from herramientas.correlacion import matriz_correlacion, preparar_mapa
+from herramientas.cubos import PRECISION_CUANTILES, cubo_dataset
+from herramientas.diagnostico import iniciar, mostrar_panel, mostrar_tabla
+from herramientas.exportar import FORMATOS, exportar, firma_exportacion
+from herramientas.figuras import mostrar_figura
+from herramientas.consulta import Consulta, col
+from herramientas.filtros import indice_columna, valores_presentes
+from herramientas.memoria import informe_memoria
+from herramientas.perezoso import importar_perezoso
+from herramientas.perfil import conteo_valores, describir, valores_unicos
+from herramientas.reduccion import PRESUPUESTO_PUNTOS, histograma, puntos_dispersion, resumen_caja
+from herramientas.tabla import tabla_paginada
+
+sns = importar_perezoso('seaborn')
+
+iniciar("App 1")
 
 st.title("Análisis de Datos CSV")  # Título de la página
 
-# Verificar si hay un DataFrame cargado en el estado de la sesión
-if 'uploaded_df' in st.session_state:
-    df = st.session_state['uploaded_df']
-    st.success("Datos cargados desde la página principal.")
-else:
-    # Ruta al archivo CSV estático 
-    ruta_csv = '../static/Base_datos.csv'  # Ajustada para acceder desde 'pages' a 'static'
-
-    try:
-        df = pd.read_csv(ruta_csv)
-        st.warning("No se ha cargado ningún archivo desde la página principal. Se están utilizando datos estáticos.")
-    except FileNotFoundError:
-        st.error(f"No se encontró el archivo CSV en la ruta: {ruta_csv}")
-        st.stop()
-    except pd.errors.EmptyDataError:
-        st.error("El archivo CSV está vacío.")
-        st.stop()
-    except pd.errors.ParserError:
-        st.error("Error al parsear el archivo CSV. Revisa el formato del archivo.")
-        st.stop()
-    except Exception as e:
-        st.error(f"Ocurrió un error al procesar el archivo: {e}")
-        st.stop()
+# Obtener la referencia al dataset (subido desde la página principal o estático)
+# Cada opción lee solo lo que necesita; el DataFrame completo solo se carga para info()
+dataset = obtener_dataset()
+columnas = columnas_dataset(dataset)
 
 st.sidebar.header("Opciones de Análisis y Descarga")
 opcion = st.sidebar.selectbox("Selecciona una opción:", 
                               ["Análisis Básico", 
+                               "Resumen por Grupos",
                                "Filtrado y Descarga"])
 
 if opcion == "Análisis Básico":
     st.write("### Primeras 5 filas del dataset:")
-    st.dataframe(df.head())
+    mostrar_tabla(leer_df(dataset, filas=(0, 5)))
 
     st.write("### Información general del DataFrame:")
+    df = leer_df(dataset)
     buffer = StringIO()
     df.info(buf=buffer)
     s = buffer.getvalue()
     st.text(s)
 
+    st.write("### Uso de memoria por columna (tipos por defecto vs. optimizados):")
+    informe = informe_memoria(dataset, df)
+    mostrar_tabla(informe.style.format(precision=1))
+    st.write(f"**Total:** {informe['Antes (KB)'].sum():,.1f} KB → {informe['Después (KB)'].sum():,.1f} KB")
+
     st.write("### Estadísticas descriptivas de las columnas numéricas:")
-    st.dataframe(df.describe())
+    mostrar_tabla(describir(dataset))
 
     # Valores únicos en la columna "País"
-    if 'País' in df.columns:
+    if 'País' in columnas:
         st.write("### Valores únicos en la columna 'País':")
-        valores_unicos_pais = df['País'].unique()
+        valores_unicos_pais = valores_unicos(dataset, 'País')
         st.write(valores_unicos_pais)
     else:
         st.warning("La columna 'País' no existe en el DataFrame.")
 
     # Conteo de ocurrencias en la columna "Género"
-    if 'Género' in df.columns:
+    if 'Género' in columnas:
         st.write("### Cantidad de ocurrencias por 'Género':")
-        conteo_genero = df['Género'].value_counts()
+        conteo_genero = conteo_valores(dataset, 'Género')
         st.bar_chart(conteo_genero)
     else:
         st.warning("La columna 'Género' no existe en el DataFrame.")
@@ -76,55 +74,129 @@ if opcion == "Análisis Básico":
     st.write("### Visualización de Datos:")
     grafico_tipo = st.selectbox("Selecciona el tipo de gráfico:", ["Dispersión", "Histograma", "Box Plot", "Mapa de Calor"])
 
+    # Los gráficos se dibujan a partir de datos reducidos en el servidor (solo columnas numéricas)
+    num_columns = columnas_numericas(dataset)
+
     if grafico_tipo == "Dispersión":
-        x_axis = st.selectbox("Selecciona la columna para el eje X:", df.columns, key='scatter_x')
-        y_axis = st.selectbox("Selecciona la columna para el eje Y:", df.columns, key='scatter_y')
-        st.line_chart(df[[x_axis, y_axis]])
+        if len(num_columns) < 2:
+            st.error("No hay suficientes columnas numéricas para realizar un gráfico de dispersión.")
+        else:
+            x_axis = st.selectbox("Selecciona la columna para el eje X:", num_columns, key='scatter_x')
+            y_axis = st.selectbox("Selecciona la columna para el eje Y:", num_columns, key='scatter_y')
+            presupuesto = st.slider("Máximo de puntos a dibujar:", 500, 50000, PRESUPUESTO_PUNTOS, step=500, key='presupuesto')
+            puntos = puntos_dispersion(dataset, x_axis, y_axis, presupuesto)
+            if puntos.attrs['ordenada']:
+                st.line_chart(puntos, x=x_axis, y=y_axis)
+            else:
+                st.scatter_chart(puntos, x=x_axis, y=y_axis, size='Puntos')
 
     elif grafico_tipo == "Histograma":
-        columna = st.selectbox("Selecciona la columna para el histograma:", df.columns, key='hist_col')
-        st.hist_chart(df[columna])
+        if len(num_columns) == 0:
+            st.error("No hay columnas numéricas para mostrar un histograma.")
+        else:
+            columna = st.selectbox("Selecciona la columna para el histograma:", num_columns, key='hist_col')
+            bins = st.slider("Número de intervalos:", 5, 100, 30, key='hist_bins')
+            st.bar_chart(histograma(dataset, columna, bins), x='Intervalo', y='Frecuencia')
 
     elif grafico_tipo == "Box Plot":
-        columna = st.selectbox("Selecciona la columna para el Box Plot:", df.columns, key='box_col')
-        fig, ax = plt.subplots()
-        sns.boxplot(y=df[columna], ax=ax)
-        st.pyplot(fig)
+        if len(num_columns) == 0:
+            st.error("No hay columnas numéricas para mostrar un Box Plot.")
+        else:
+            columna = st.selectbox("Selecciona la columna para el Box Plot:", num_columns, key='box_col')
+            resumen = resumen_caja(dataset, columna)
+            if not resumen:
+                st.error("La columna seleccionada no tiene valores numéricos.")
+            else:
+                def dibujar(fig):
+                    fig.subplots().bxp([resumen])
+                mostrar_figura(dataset, 'caja', (columna,), dibujar)
 
     elif grafico_tipo == "Mapa de Calor":
-        fig, ax = plt.subplots()
-        sns.heatmap(df.corr(), annot=True, cmap='coolwarm', ax=ax)
-        st.pyplot(fig)
+        metodo = st.radio("Método de correlación:", ["pearson", "spearman"], horizontal=True, key='metodo_corr')
+        corr = matriz_correlacion(dataset, metodo)
+        if corr.empty:
+            st.error("No se puede generar un mapa de calor debido a la falta de datos numéricos.")
+        else:
+            mapa = preparar_mapa(corr)
+            if len(mapa) < len(corr):
+                st.info(f"Se muestran las {len(mapa)} columnas más correlacionadas de {len(corr)}.")
+            def dibujar(fig):
+                sns.heatmap(mapa, annot=True, cmap='coolwarm', ax=fig.subplots())
+            mostrar_figura(dataset, 'mapa_calor', (metodo,), dibujar)
+
+elif opcion == "Resumen por Grupos":
+    st.write("### Resumen de las columnas numéricas por grupos:")
+
+    # Se responde desde el cubo precalculado al ingerir: el coste no depende del número de filas
+    cubo = cubo_dataset(dataset)
+    if cubo is None:
+        st.warning("El dataset no tiene columnas 'País' o 'Género' con pocas combinaciones para agrupar.")
+    else:
+        agrupar_por = st.multiselect("Agrupar por:", cubo.dimensiones, default=cubo.dimensiones[:1], key='resumen_por')
+        medidas = st.multiselect("Columnas numéricas:", cubo.medidas, default=cubo.medidas[:3], key='resumen_medidas')
+        if medidas:
+            resumen = cubo.resumen(agrupar_por, medidas=medidas)
+            mostrar_tabla(resumen.style.format(precision=2))
+            st.caption(f"Calculado a partir de {len(cubo.celdas):,} combinaciones de {' × '.join(cubo.dimensiones)}. "
+                       f"Los cuartiles son aproximados: el error es como mucho un {PRECISION_CUANTILES:.0%} de la "
+                       f"distancia del valor al mínimo de cada combinación.")
+        else:
+            st.info("Selecciona al menos una columna numérica.")
 
 elif opcion == "Filtrado y Descarga":
     st.write("### Filtrar datos:")
     
-    # Filtros independientes
+    # Plan perezoso: cada filtro es un paso más de la consulta. Al ejecutarla, los filtros de igualdad y
+    # 'contiene' usan los índices cacheados por dataset y las filas de cada prefijo del plan se reutilizan
+    consulta = Consulta(dataset)
+
     # Filtrar por "País"
-    if 'País' in df.columns:
+    if 'País' in columnas:
         st.subheader("Filtrar por País")
-        pais_filtrar = st.selectbox("Selecciona el País:", ["Todos"] + df['País'].unique().tolist(), key='pais_filter')
+        pais_filtrar = st.selectbox("Selecciona el País:", ["Todos"] + valores_presentes(dataset, 'País'), key='pais_filter')
         if pais_filtrar != "Todos":
-            df = df[df['País'] == pais_filtrar]
+            consulta = consulta.filtrar(col('País') == pais_filtrar)
 
-    # Filtrar por "Género"
-    if 'Género' in df.columns:
+    # Filtrar por "Género" (solo los géneros presentes tras el filtro de País, sacados del cubo si lo hay)
+    if 'Género' in columnas:
         st.subheader("Filtrar por Género")
-        genero_filtrar = st.selectbox("Selecciona el Género:", ["Todos"] + df['Género'].unique().tolist(), key='genero_filter')
+        cubo = cubo_dataset(dataset)
+        if cubo is not None and 'Género' in cubo.dimensiones:
+            generos = cubo.valores('Género', {'País': pais_filtrar} if 'País' in columnas and pais_filtrar != "Todos" else None)
+        else:
+            generos = indice_columna(dataset, 'Género').valores_en(consulta.posiciones())
+        genero_filtrar = st.selectbox("Selecciona el Género:", ["Todos"] + generos, key='genero_filter')
         if genero_filtrar != "Todos":
-            df = df[df['Género'] == genero_filtrar]
+            consulta = consulta.filtrar(col('Género') == genero_filtrar)
 
     # Filtrar por otra columna (ejemplo genérico)
-    otras_columnas = [col for col in df.columns if col not in ['País', 'Género']]
+    otras_columnas = [c for c in columnas if c not in ['País', 'Género']]
     columna_filtrar = st.selectbox("Selecciona la columna para filtrar:", otras_columnas, key='otra_columna')
     valor_filtrar = st.text_input(f"Ingresa el valor para filtrar en '{columna_filtrar}':")
 
-    if valor_filtrar and columna_filtrar in df.columns:
-        df = df[df[columna_filtrar].astype(str).str.contains(valor_filtrar, case=False, na=False)]
+    if valor_filtrar and columna_filtrar in columnas:
+        consulta = consulta.filtrar(col(columna_filtrar).contiene(valor_filtrar))
 
-    # Mostrar datos filtrados
-    st.write("#### Datos filtrados:")
-    st.dataframe(df)
+    posiciones = consulta.posiciones()
 
-    # Descargar CSV filtrado
-    st.markdown(descargar_csv(df), unsafe_allow_html=True)
+    # Mostrar datos filtrados, página a página (las filas filtradas se quedan en el servidor)
+    st.write("#### Datos filtrados:")
+    tabla_paginada(dataset, posiciones, clave='filtrados')
+
+    # Descargar datos filtrados: el archivo solo se genera (por bloques, en disco) cuando se pide
+    st.write("#### Descargar datos procesados:")
+    formato = st.selectbox("Formato de descarga:", list(FORMATOS), key='formato_descarga')
+    firma = firma_exportacion(dataset, consulta.pasos, formato)
+    if st.button("Preparar descarga"):
+        with st.spinner("Generando archivo..."):
+            st.session_state['exportacion'] = (firma, exportar(dataset, posiciones, consulta.pasos, formato))
+
+    exportacion = st.session_state.get('exportacion')
+    # El archivo puede haberse borrado al superar el límite de exportaciones en disco: se vuelve a preparar
+    if exportacion is not None and exportacion[0] == firma and os.path.exists(exportacion[1]):
+        extension, mime = FORMATOS[formato]
+        with open(exportacion[1], 'rb') as archivo:
+            st.download_button("Descargar Datos Procesados", archivo,
+                               file_name=f"datos_procesados.{extension}", mime=mime)
+
+mostrar_panel()
@@ -0,0 +1,7 @@
+# tests/test_arranque.py
+
+from herramientas.arranque import verificar_presupuesto
+
+
+def test_paginas_dentro_del_presupuesto_de_arranque():
+    assert verificar_presupuesto() == []
@@ -0,0 +1,21 @@
+# tests/test_cache.py
+
+from herramientas.cache import CacheLRU
+
+
+def test_expulsa_los_menos_usados():
+    cache = CacheLRU(10)
+    cache.guardar('a', 1, 4)
+    cache.guardar('b', 2, 4)
+    cache.obtener('a')
+    cache.guardar('c', 3, 4)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.total_bytes == 8
+
+
+def test_no_guarda_valores_mayores_que_el_limite():
+    cache = CacheLRU(10)
+    cache.guardar('a', 1, 4)
+    assert cache.obtener_o_calcular('grande', lambda: 'valor', lambda v: 11) == 'valor'
+    assert 'grande' not in cache and 'a' in cache
+    assert cache.total_bytes == 4
@@ -0,0 +1,54 @@
+# tests/test_consulta.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from herramientas import consulta as modulo
+from herramientas.carga import huella_flujo, ingerir_csv
+from herramientas.consulta import Consulta, col
+
+FILAS = 500
+
+
+@pytest.fixture(scope='module')
+def datos(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Nombre': [f'Ana {i}' if i % 3 else f'Pedro {i}' for i in range(FILAS)],
+        'País': rng.choice(['España', 'Perú', 'México'], FILAS),
+        'Edad': rng.integers(18, 90, FILAS),
+        'Peso': rng.integers(50, 100, FILAS),
+        'Altura': rng.choice([1.5, 1.7, 70.0, 1.75], FILAS),
+    })
+    df.loc[::11, 'Altura'] = np.nan
+    ruta_csv = tmp_path_factory.mktemp('consulta') / 'datos.csv'
+    df.to_csv(ruta_csv, index=False)
+    referencia = pd.read_csv(ruta_csv)
+    with open(ruta_csv, 'rb') as archivo:
+        clave = huella_flujo(archivo)
+        ruta = str(ruta_csv.with_suffix('.parquet'))
+        ingerir_csv(archivo, ',', ruta)
+    return {'clave': clave, 'ruta': ruta}, referencia
+
+
+def _esperado(referencia, umbral, columna, patron):
+    serie = referencia[columna]
+    regex = patron != '['
+    coincide = serie.notna() & serie.astype(str).str.contains(patron, case=False, regex=regex)
+    return np.flatnonzero((referencia['Edad'] > umbral) & coincide)
+
+
+# Con FRACCION_INDICE = 0 el filtro usa siempre el índice de la columna; con 2, nunca
+@pytest.mark.parametrize('fraccion', [0, 2])
+@pytest.mark.parametrize('umbral', [-1, 40, 1000])
+@pytest.mark.parametrize('columna, patron', [
+    ('Nombre', '^ana'), ('País', 'per'), ('Peso', '7'), ('Altura', '70.0'), ('Altura', '1.7'), ('Nombre', '['),
+])
+def test_contiene_igual_que_pandas_por_ambos_caminos(datos, monkeypatch, fraccion, umbral, columna, patron):
+    dataset, referencia = datos
+    monkeypatch.setattr(modulo, 'FRACCION_INDICE', fraccion)
+    # Cada camino con su propia clave, para no reutilizar selecciones cacheadas por el otro
+    dataset = dict(dataset, clave=f"{dataset['clave']}-{fraccion}")
+    consulta = Consulta(dataset).filtrar(col('Edad') > umbral).filtrar(col(columna).contiene(patron))
+    np.testing.assert_array_equal(consulta.posiciones(), _esperado(referencia, umbral, columna, patron))
@@ -0,0 +1,28 @@
+# tests/test_cubos.py
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from herramientas.cubos import CUANTILES, PRECISION_CUANTILES, Cubo
+
+FILAS = 20_000
+
+
+@pytest.mark.parametrize('centro, amplitud', [(1000, 1), (1.7, 0.1), (0, 50)])
+def test_cuartiles_dentro_del_error_con_desplazamiento(centro, amplitud):
+    rng = np.random.default_rng(0)
+    tabla = pa.table({
+        'País': rng.choice(['España', 'Perú', 'México'], FILAS),
+        'Género': rng.choice(['Femenino', 'Masculino'], FILAS),
+        'Peso': centro + rng.uniform(-amplitud, amplitud, FILAS),
+    })
+    cubo = Cubo.de_columnas(tabla.select(['País', 'Género']), tabla.column, ['Peso'])
+    resumen = cubo.resumen(por=['Género'])
+    datos = tabla.to_pandas()
+    for genero, grupo in datos.groupby('Género'):
+        peso = grupo['Peso']
+        # El error de cada cubeta es relativo a la distancia al mínimo de su celda, como mucho el rango
+        tolerancia = 2 * PRECISION_CUANTILES * (peso.max() - peso.min())
+        for q in CUANTILES:
+            assert resumen.loc[(genero, 'Peso'), f'{q:.0%}'] == pytest.approx(peso.quantile(q), abs=tolerancia)
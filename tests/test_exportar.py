@@ -0,0 +1,74 @@
+# tests/test_exportar.py
+
+import os
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from herramientas import exportar as modulo
+from herramientas.exportar import exportar
+
+FILAS = 300_000
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo, 'DIRECTORIO_EXPORTACIONES', str(tmp_path / 'exportaciones'))
+    return tmp_path
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Edad': rng.integers(18, 90, FILAS),
+        'Ingreso': rng.random(FILAS) * 1e5,
+        'País': rng.choice(['España', 'México', 'Perú'], FILAS),
+    })
+    ruta = str(tmp_path_factory.mktemp('exportar') / 'datos.parquet')
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), ruta)
+    return {'clave': 'prueba', 'ruta': ruta}
+
+
+def _pico(funcion):
+    tracemalloc.start()
+    try:
+        funcion()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# Parquet se serializa en memoria de Arrow, que tracemalloc no ve
+@pytest.mark.parametrize('formato', ['CSV', 'CSV comprimido (gzip)'])
+def test_exportar_pico_de_memoria_acotado(directorio, dataset, formato, monkeypatch):
+    # Por bloques, el pico depende del tamaño del bloque y no del resultado: cuatro veces más filas
+    # apenas cambian el pico
+    monkeypatch.setattr(modulo, 'FILAS_POR_BLOQUE', 20_000)
+    cuarto = np.arange(FILAS // 4)
+    pico_cuarto = _pico(lambda: exportar(dataset, cuarto, ('cuarto',), formato))
+    pico = _pico(lambda: exportar(dataset, None, (), formato))
+    assert pico < 1.5 * pico_cuarto
+
+
+@pytest.mark.parametrize('formato', ['CSV', 'Parquet'])
+def test_exportar_solo_las_filas_seleccionadas(directorio, dataset, formato):
+    posiciones = np.arange(0, FILAS, 7)
+    ruta = exportar(dataset, posiciones, ('cada 7',), formato)
+    leido = pd.read_csv(ruta) if formato == 'CSV' else pd.read_parquet(ruta)
+    esperado = pd.read_parquet(dataset['ruta']).take(posiciones).reset_index(drop=True)
+    pd.testing.assert_frame_equal(leido, esperado)
+
+
+def test_exportar_respeta_limite_en_disco(directorio, dataset, monkeypatch):
+    monkeypatch.setattr(modulo, 'LIMITE_EXPORTACIONES_MB', 1)
+    pocas = np.arange(20_000)
+    primera = exportar(dataset, pocas, ('a',), 'CSV')
+    os.utime(primera, (0, 0))
+    segunda = exportar(dataset, pocas, ('b',), 'CSV')
+    assert not os.path.exists(primera)
+    assert os.path.exists(segunda)